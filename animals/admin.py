@@ -1,19 +1,53 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.utils.html import format_html
-from django.urls import reverse
-from .models import Animal, MedicalRecord, AnimalPhoto, Vaccination
-from .export_utils import export_animals_to_excel, export_vaccinations_to_excel
-class MedicalRecordInline(admin.TabularInline):
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse, path
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.conf import settings
+from datetime import timedelta
+from .models import Animal, MedicalRecord, AnimalPhoto, Vaccination, LatestVaccination, ExportJob
+from .export_utils import export_animals_to_excel, export_vaccinations_to_excel, export_response
+from .stats import get_animal_stats
+from .qr_codes import enqueue_qr_codes
+from .export_jobs import enqueue_export
+from .search import search_animals
+from .vaccination_schedule import DEFAULT_UPCOMING_DAYS
+from .vaccination_status import STATUS_LABELS, attach_vaccination_summaries, get_vaccination_summary
+
+
+def redirect_to_export_job(model_admin, request, job):
+    """Send the user to the status page of a freshly queued export"""
+    model_admin.message_user(request, f'Η εξαγωγή #{job.pk} προστέθηκε στην ουρά. Η σελίδα δείχνει την πρόοδό της.')
+    return HttpResponseRedirect(reverse('admin:animals_exportjob_change', args=[job.pk]))
+
+
+def queue_changelist_export(model_admin, request, queryset, kind, format='xlsx'):
+    """Queue a background export of the rows the changelist shows (filters, search, ordering)"""
+    if request.POST.get('select_across') != '1':
+        # Only some rows were ticked: the action's queryset is limited to them
+        queryset = model_admin.get_changelist_instance(request).get_queryset(request)
+    return redirect_to_export_job(model_admin, request, enqueue_export(kind, queryset, request.user, format))
+
+class AnimalInlineMixin:
+    """The rows' __str__ shows the animal's name: load it with the rows, not once per row"""
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('animal')
+
+class MedicalRecordInline(AnimalInlineMixin, admin.TabularInline):
     model = MedicalRecord
     extra = 1
 
-class AnimalPhotoInline(admin.TabularInline):
+class AnimalPhotoInline(AnimalInlineMixin, admin.TabularInline):
     model = AnimalPhoto
     extra = 1
     fields = ['image', 'is_primary', 'caption']
     readonly_fields = []
 
-class VaccinationInline(admin.StackedInline):
+class VaccinationInline(AnimalInlineMixin, admin.StackedInline):
     model = Vaccination
     extra = 1
     fields =['vaccine_name', 'other_vaccine_name', 'batch_number', 'date_administered', 'administered_by'] 
@@ -54,9 +88,20 @@ class VaccinationInline(admin.StackedInline):
     def has_delete_permission(self, request, obj=None):
         """Prevent deletion of vaccination records"""
         return False
+
+class AnimalChangeList(ChangeList):
+    """Search results ranked by relevance (see AnimalAdmin.get_search_results)"""
+
+    def get_ordering(self, request, queryset):
+        # Best matches first, unless a column was clicked: the rank ordering
+        # only exists once get_search_results() has annotated it
+        if ORDER_VAR not in self.params and 'search_rank' in queryset.query.annotations:
+            return self._get_deterministic_ordering(list(queryset.query.order_by))
+        return super().get_ordering(request, queryset)
+
 @admin.register(Animal)
 class AnimalAdmin(admin.ModelAdmin):
-    actions =['export_selected_to_excel', 'export_all_to_excel', 'regenerate_qr_codes', 'make_public', 'make_private']
+    actions =['export_selected_to_excel', 'export_all_to_excel', 'export_selected_to_csv', 'export_all_to_csv', 'export_selected_to_parquet', 'export_all_to_parquet', 'regenerate_qr_codes', 'make_public', 'make_private']
     
     def get_actions(self, request):
         actions = super().get_actions(request)
@@ -64,11 +109,12 @@ class AnimalAdmin(admin.ModelAdmin):
             actions['delete_selected'][0].short_description = "Διαγραφή επιλεγμένων"
         return actions
     
-    list_display = ['photo_display', 'name', 'chip_id', 'species', 'gender', 'age_display', 'behavior', 'adoption_status', 'public_visibility', 'qr_code_display']
+    list_select_related = ['primary_photo']
+    list_display = ['photo_display', 'name', 'chip_id', 'species', 'gender', 'age_display', 'behavior', 'vaccination_display', 'adoption_status', 'public_visibility', 'qr_code_display']
     list_filter = ['species', 'gender', 'behavior', 'adoption_status', 'public_visibility', 'sterilization_status', 'shelter']
     search_fields = ['name', 'chip_id', 'capture_location', 'shelter']
     inlines = [VaccinationInline, MedicalRecordInline, AnimalPhotoInline]
-    readonly_fields = ['created_by', 'created_at', 'updated_at', 'entry_date', 'qr_code_preview']
+    readonly_fields = ['created_by', 'created_at', 'updated_at', 'entry_date', 'qr_code_preview', 'qr_status', 'qr_error']
     
     fieldsets = (
         ('Βασικές Πληροφορίες', {
@@ -88,7 +134,7 @@ class AnimalAdmin(admin.ModelAdmin):
             'fields': ('finder_contact', 'adoption_status', 'public_visibility')
         }),
         ('QR Code', {
-            'fields': ('qr_code', 'qr_code_preview'),
+            'fields': ('qr_code', 'qr_code_preview', 'qr_status', 'qr_error'),
             'classes': ('collapse',)
         }),
         ('Μεταδεδομένα', {
@@ -108,44 +154,44 @@ class AnimalAdmin(admin.ModelAdmin):
     
     def photo_display(self, obj):
         """Display animal's primary photo or first available photo as thumbnail"""
-        photo = obj.photos.filter(is_primary=True).first() or obj.photos.first()
+        photo = obj.primary_photo
         
         if photo and photo.image:
             return format_html(
                 '<img src="{}" width="60" height="60" style="object-fit: cover; border-radius: 4px; border: 1px solid #ccc;" title="{}"/>',
-                photo.image.url,
+                photo.rendition_url('thumb', 'webp'),
                 obj.name
             )
         return format_html('<span style="color: #999;">📷 No photo</span>')
     
     photo_display.short_description = 'Φωτογραφία'
     
+    def get_search_results(self, request, queryset, search_term):
+        """Indexed, accent-insensitive search instead of icontains on each field"""
+        if not search_term.strip():
+            return queryset, False
+        # On PostgreSQL the matches come back annotated and ordered by search_rank
+        return search_animals(queryset, search_term), False
+    
+    def get_changelist(self, request, **kwargs):
+        return AnimalChangeList
+    
+    def get_list_filter(self, request):
+        list_filter = list(super().get_list_filter(request))
+        if settings.VACCINATION_STATUS_DENORMALIZED:
+            list_filter.insert(3, 'vaccination_status')
+        return list_filter
+    
+    def get_changelist_instance(self, request):
+        """Vaccination summaries for the whole page in one grouped query"""
+        changelist = super().get_changelist_instance(request)
+        changelist.result_list = attach_vaccination_summaries(changelist.result_list)
+        return changelist
+    
     def changelist_view(self, request, extra_context=None):
         """Override to add statistics to the changelist page"""
-        from django.db.models import Count, Q
-        
-        stats = {
-            'total': Animal.objects.count(),
-            'dogs': Animal.objects.filter(species='dog').count(),
-            'cats': Animal.objects.filter(species='cat').count(),
-            'other_species': Animal.objects.filter(species='other').count(),
-            'males': Animal.objects.filter(gender='male').count(),
-            'females': Animal.objects.filter(gender='female').count(),
-            'sterilized': Animal.objects.filter(sterilization_status='yes').count(),
-            'not_sterilized': Animal.objects.filter(sterilization_status='no').count(),
-            'sterilization_scheduled': Animal.objects.filter(sterilization_status='scheduled').count(),
-            'injured': Animal.objects.filter(injured=True).count(),
-            'healthy': Animal.objects.filter(injured=False).count(),
-            'available': Animal.objects.filter(adoption_status='available').count(),
-            'pending': Animal.objects.filter(adoption_status='pending').count(),
-            'adopted': Animal.objects.filter(adoption_status='adopted').count(),
-            'not_for_adoption': Animal.objects.filter(adoption_status='not_for_adoption').count(),
-            'public': Animal.objects.filter(public_visibility=True).count(),
-            'private': Animal.objects.filter(public_visibility=False).count(),
-        }
-        
         extra_context = extra_context or {}
-        extra_context['stats'] = stats
+        extra_context['stats'] = get_animal_stats()
         return super().changelist_view(request, extra_context=extra_context)
     
     def age_display(self, obj):
@@ -156,12 +202,24 @@ class AnimalAdmin(admin.ModelAdmin):
         return "Μη καθορισμένη"
     age_display.short_description = 'Ηλικία'
     
+    def vaccination_display(self, obj):
+        summary = get_vaccination_summary(obj)
+        colors = {'current': '#417690', 'overdue': '#ba2121', 'unvaccinated': '#999'}
+        rabies = "✔ Λύσσα" if summary.rabies_current else "✘ Λύσσα"
+        return format_html(
+            '<span style="color: {};" title="{}">{}</span>',
+            colors[summary.status], rabies, STATUS_LABELS[summary.status]
+        )
+    vaccination_display.short_description = 'Εμβολιασμοί'
+    
     def qr_code_display(self, obj):
         if obj.qr_code:
             return format_html(
                 '<img src="{}" width="50" height="50" style="border: 1px solid #ccc;" title="QR Code"/>',
                 obj.qr_code.url
             )
+        if obj.qr_status == 'failed':
+            return format_html('<span style="color: #ba2121;" title="{}">QR failed</span>', obj.qr_error)
         return "No QR"
     qr_code_display.short_description = 'QR Code'
     
@@ -208,16 +266,9 @@ class AnimalAdmin(admin.ModelAdmin):
         formset.save_m2m()
     
     def regenerate_qr_codes(self, request, queryset):
-        """Admin action to regenerate QR codes for selected animals"""
-        count = 0
-        for animal in queryset:
-            if animal.qr_code:
-                animal.qr_code.delete(save=False)
-            animal.generate_qr_code()
-            animal.save(update_fields=['qr_code'])
-            count += 1
-        
-        self.message_user(request, f'Successfully regenerated QR codes for {count} animals.')
+        """Admin action to queue QR code regeneration for selected animals"""
+        count = enqueue_qr_codes(queryset)
+        self.message_user(request, f'Queued QR code regeneration for {count} animals.')
     regenerate_qr_codes.short_description = 'Αναδημιουργία QR codes για επιλεγμένα ζώα'
     
     def make_public(self, request, queryset):
@@ -237,17 +288,33 @@ class AnimalAdmin(admin.ModelAdmin):
     export_selected_to_excel.short_description = 'Εξαγωγή επιλεγμένων σε Excel'
     
     def export_all_to_excel(self, request, queryset):
-        """Export all animals (respecting current filters) to Excel"""
-        # Get all animals with current filters applied
-        all_animals = self.get_queryset(request)
-        return export_animals_to_excel(all_animals)
+        """Queue a background export of all animals matching the changelist filters and search"""
+        return queue_changelist_export(self, request, queryset, 'animals')
     export_all_to_excel.short_description = 'Εξαγωγή όλων σε Excel (με φίλτρα)'
+    
+    def export_selected_to_csv(self, request, queryset):
+        return export_response('animals', queryset, 'csv')
+    export_selected_to_csv.short_description = 'Εξαγωγή επιλεγμένων σε CSV'
+    
+    def export_all_to_csv(self, request, queryset):
+        return queue_changelist_export(self, request, queryset, 'animals', 'csv')
+    export_all_to_csv.short_description = 'Εξαγωγή όλων σε CSV (με φίλτρα)'
+    
+    def export_selected_to_parquet(self, request, queryset):
+        return export_response('animals', queryset, 'parquet')
+    export_selected_to_parquet.short_description = 'Εξαγωγή επιλεγμένων σε Parquet'
+    
+    def export_all_to_parquet(self, request, queryset):
+        return queue_changelist_export(self, request, queryset, 'animals', 'parquet')
+    export_all_to_parquet.short_description = 'Εξαγωγή όλων σε Parquet (με φίλτρα)'
 
 
 
 @admin.register(MedicalRecord)
 class MedicalRecordAdmin(admin.ModelAdmin):
     list_display = ['animal', 'record_type', 'date_recorded', 'created_by']
+    # created_by is nullable, so the admin's automatic select_related() skips it
+    list_select_related = ['animal', 'created_by']
     list_filter = ['record_type', 'date_recorded']
     search_fields = ['animal__name', 'animal__chip_id', 'description']
     readonly_fields = ['created_by', 'created_at']
@@ -260,15 +327,15 @@ class MedicalRecordAdmin(admin.ModelAdmin):
 
 @admin.register(Vaccination)
 class VaccinationAdmin(admin.ModelAdmin):
-    actions = ['export_selected_to_excel', 'export_all_to_excel']
+    actions = ['export_selected_to_excel', 'export_all_to_excel', 'export_selected_to_csv', 'export_all_to_csv', 'export_selected_to_parquet', 'export_all_to_parquet']
     list_display = ['animal', 'vaccine_name', 'date_administered', 'next_due_date', 'administered_by', 'created_by']
+    list_select_related = ['animal', 'created_by']
     list_filter = ['vaccine_name', 'date_administered']
     search_fields = ['animal__name', 'animal__chip_id', 'administered_by']
     readonly_fields = ['created_by', 'created_at']
-    
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.extra(select={'is_rabies': "CASE WHEN vaccine_name = 'rabies' THEN 0 ELSE 1 END"}).order_by('is_rabies', '-date_administered')
+    # Rabies first (mandatory by law), served by vacc_priority_date_idx.
+    # The changelist applies it too, so the background exports keep it.
+    ordering = Vaccination.PRIORITY_ORDERING
     
     def get_readonly_fields(self, request, obj=None):
         readonly = list(self.readonly_fields)
@@ -284,10 +351,25 @@ class VaccinationAdmin(admin.ModelAdmin):
     export_selected_to_excel.short_description = 'Εξαγωγή επιλεγμένων σε Excel'
     
     def export_all_to_excel(self, request, queryset):
-        all_vaccinations = self.get_queryset(request)
-        return export_vaccinations_to_excel(all_vaccinations)
+        return queue_changelist_export(self, request, queryset, 'vaccinations')
     export_all_to_excel.short_description = 'Εξαγωγή όλων σε Excel (με φίλτρα)'
     
+    def export_selected_to_csv(self, request, queryset):
+        return export_response('vaccinations', queryset, 'csv')
+    export_selected_to_csv.short_description = 'Εξαγωγή επιλεγμένων σε CSV'
+    
+    def export_all_to_csv(self, request, queryset):
+        return queue_changelist_export(self, request, queryset, 'vaccinations', 'csv')
+    export_all_to_csv.short_description = 'Εξαγωγή όλων σε CSV (με φίλτρα)'
+    
+    def export_selected_to_parquet(self, request, queryset):
+        return export_response('vaccinations', queryset, 'parquet')
+    export_selected_to_parquet.short_description = 'Εξαγωγή επιλεγμένων σε Parquet'
+    
+    def export_all_to_parquet(self, request, queryset):
+        return queue_changelist_export(self, request, queryset, 'vaccinations', 'parquet')
+    export_all_to_parquet.short_description = 'Εξαγωγή όλων σε Parquet (με φίλτρα)'
+    
     def save_model(self, request, obj, form, change):
         if not change:
             obj.created_by = request.user
@@ -296,26 +378,136 @@ class VaccinationAdmin(admin.ModelAdmin):
 
 @admin.register(AnimalPhoto)
 class AnimalPhotoAdmin(admin.ModelAdmin):
-    list_display = ['animal', 'is_primary', 'caption', 'uploaded_at', 'image_preview']
+    list_display = ['animal', 'is_primary', 'caption', 'uploaded_at', 'image_preview', 'size_display']
+    list_select_related = ['animal']
     list_filter = ['is_primary', 'uploaded_at']
     search_fields = ['animal__name', 'animal__chip_id', 'caption']
-    readonly_fields = ['uploaded_by', 'uploaded_at', 'image_preview']
+    readonly_fields = ['uploaded_by', 'uploaded_at', 'image_preview', 'size_display', 'original_display']
     
     def image_preview(self, obj):
         if obj.image:
             return format_html(
                 '<img src="{}" width="100" height="100" style="object-fit: cover; border: 1px solid #ccc;"/>',
-                obj.image.url
+                obj.rendition_url('thumb', 'webp')
             )
         return "No image"
     image_preview.short_description = 'Προεπισκόπηση'
     
+    def size_display(self, obj):
+        if obj.bytes_saved is None:
+            return '-'
+        percent = 100 * obj.bytes_saved / obj.original_size if obj.original_size else 0
+        return f'{filesizeformat(obj.original_size)} → {filesizeformat(obj.stored_size)} ({-percent:+.0f}%)'
+    size_display.short_description = 'Μέγεθος'
+    
+    def original_display(self, obj):
+        # Private storage: the raw upload (with its EXIF data) has no URL
+        return obj.original.name if obj.original else '-'
+    original_display.short_description = 'Πρωτότυπο'
+    
     def save_model(self, request, obj, form, change):
         if not change:
             obj.uploaded_by = request.user
         super().save_model(request, obj, form, change)
 
 
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'format', 'status', 'progress_display', 'row_count', 'duration_display', 'requested_by', 'created_at', 'download_link']
+    list_filter = ['kind', 'format', 'status']
+    list_select_related = ['requested_by']
+    fields = ['kind', 'format', 'status', 'progress_display', 'row_count', 'total_rows', 'duration_display', 'download_link', 'error', 'requested_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view), name='animals_exportjob_download'),
+        ] + super().get_urls()
+    
+    def download_view(self, request, pk):
+        """Serve the export file through the admin so it stays behind login"""
+        job = get_object_or_404(ExportJob, pk=pk)
+        if not self.has_view_permission(request, job):
+            raise Http404
+        if job.status != 'done' or not job.file:
+            raise Http404('Export file is not available')
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.rsplit('/', 1)[-1])
+    
+    def progress_display(self, obj):
+        progress = obj.progress
+        return f"{progress}%" if progress is not None else "-"
+    progress_display.short_description = 'Πρόοδος'
+    
+    def duration_display(self, obj):
+        duration = obj.duration
+        return f"{duration.total_seconds():.1f}s" if duration is not None else "-"
+    duration_display.short_description = 'Διάρκεια'
+    
+    def download_link(self, obj):
+        if obj.status == 'done' and obj.file:
+            return format_html('<a href="{}" class="button">Λήψη</a>', reverse('admin:animals_exportjob_download', args=[obj.pk]))
+        return "-"
+    download_link.short_description = 'Αρχείο'
+
+
+class DueStatusFilter(admin.SimpleListFilter):
+    title = 'Κατάσταση'
+    parameter_name = 'due'
+    
+    def lookups(self, request, model_admin):
+        return [
+            ('overdue', 'Εκπρόθεσμα'),
+            ('upcoming', f'Επόμενες {DEFAULT_UPCOMING_DAYS} ημέρες'),
+        ]
+    
+    def queryset(self, request, queryset):
+        # Range conditions on the next_due_date index
+        today = timezone.localdate()
+        if self.value() == 'overdue':
+            return queryset.filter(next_due_date__lt=today)
+        if self.value() == 'upcoming':
+            return queryset.filter(next_due_date__gte=today, next_due_date__lte=today + timedelta(days=DEFAULT_UPCOMING_DAYS))
+        return queryset
+
+
+@admin.register(LatestVaccination)
+class LatestVaccinationAdmin(admin.ModelAdmin):
+    """Read-only due dates, maintained from Vaccination"""
+    list_display = ['animal', 'vaccine_display', 'date_administered', 'next_due_date', 'due_display']
+    list_filter = [DueStatusFilter, 'vaccine_name']
+    list_select_related = ['animal']
+    search_fields = ['animal__name', 'animal__chip_id']
+    date_hierarchy = 'next_due_date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def vaccine_display(self, obj):
+        return obj.get_vaccine_display_name()
+    vaccine_display.short_description = 'Εμβόλιο'
+    
+    def due_display(self, obj):
+        days = obj.days_until_due
+        if days is None:
+            return "-"
+        if days < 0:
+            return format_html('<span style="color: #c00;">Εκπρόθεσμο ({} ημ.)</span>', -days)
+        return f"σε {days} ημ."
+    due_display.short_description = 'Λήξη'
+
+
 # Customize admin site header and title
 from django.contrib import admin as admin_module
 from .version import get_version
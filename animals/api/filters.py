@@ -0,0 +1,27 @@
+from rest_framework import filters
+
+from ..search import search_animals
+
+
+class AnimalSearchFilter(filters.SearchFilter):
+    """?search= backed by the indexed search_document (see animals/search.py)"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_animals(queryset, ' '.join(terms))
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    ?ordering= for cursor paginated views: the ordering always ends with the
+    primary key, so rows with equal values (two animals named Rex) keep one
+    order and the cursor's offset into them stays valid from page to page.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            return ordering
+        return [*ordering, '-id' if ordering[0].startswith('-') else 'id']
@@ -0,0 +1,22 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id): no COUNT(*) and no OFFSET scans,
+    and pages stay stable while new rows are inserted.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class UploadedAtCursorPagination(CreatedAtCursorPagination):
+    """AnimalPhoto has no created_at; uploaded_at plays the same role"""
+    ordering = ('-uploaded_at', '-id')
+
+
+class DueDateCursorPagination(CreatedAtCursorPagination):
+    """Due vaccinations, soonest first"""
+    ordering = ('next_due_date', 'id')
@@ -0,0 +1,31 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from ..export_utils import EXPORT_FORMATS
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets DRF content negotiation accept ?format=<export format>.
+    Export views return the file response themselves; only error
+    responses (e.g. permission denied) are rendered, as JSON.
+    """
+    charset = None
+    render_style = 'binary'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class XLSXRenderer(ExportRenderer):
+    format = 'xlsx'
+    media_type = EXPORT_FORMATS['xlsx'].content_type
+
+
+class CSVRenderer(ExportRenderer):
+    format = 'csv'
+    media_type = 'text/csv'
+
+
+class ParquetRenderer(ExportRenderer):
+    format = 'parquet'
+    media_type = EXPORT_FORMATS['parquet'].content_type
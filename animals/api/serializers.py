@@ -1,17 +1,150 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from ..models import Animal, MedicalRecord, AnimalPhoto
+from ..models import Animal, MedicalRecord, AnimalPhoto, Vaccination, LatestVaccination
+from ..vaccination_status import get_vaccination_summary, summary_payload
+from ..renditions import RENDITIONS, RENDITION_FORMATS
+
+
+def query_param_set(request, name):
+    """Comma separated query parameter as a set (?fields=a,b -> {'a', 'b'})"""
+    if request is None:
+        return set()
+    value = request.query_params.get(name, '')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b limits the output to the listed fields and ?expand=x adds
+    the nested relations declared in Meta.expandable_fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+
+        expand = query_param_set(request, 'expand') & set(expandable)
+        for name in expand:
+            self.fields[name] = expandable[name](many=True, read_only=True)
+
+        fields = query_param_set(request, 'fields')
+        if fields:
+            for name in set(self.fields) - fields - expand:
+                self.fields.pop(name)
+
+    @classmethod
+    def model_fields_for(cls, field_names):
+        """Model field paths (for .only()) needed to render the given serializer fields"""
+        sources = getattr(cls.Meta, 'only_sources', {})
+        concrete = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        only = {'pk'}
+        for name in field_names:
+            if name in sources:
+                only.update(sources[name])
+            elif name in concrete:
+                only.add(name)
+        return only
+
+
+def absolute_url(request, url):
+    return request.build_absolute_uri(url) if request and url else url
+
 
 class AnimalPhotoSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+    bytes_saved = serializers.IntegerField(read_only=True)
+    
     class Meta:
         model = AnimalPhoto
-        fields = '__all__'
+        # The raw upload may still carry EXIF/GPS data
+        exclude = ['original']
+    
+    def save(self, **kwargs):
+        # AnimalPhoto.save() rejects images it cannot normalize
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(serializers.as_serializer_error(error))
+    
+    def get_renditions(self, obj):
+        """{'thumb': {'webp': url, 'jpeg': url}, 'card': ..., 'full': ...}"""
+        request = self.context.get('request')
+        return {
+            name: {fmt: absolute_url(request, obj.rendition_url(name, fmt)) for fmt in RENDITION_FORMATS}
+            for name in RENDITIONS
+        } if obj.image else None
 
 class MedicalRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = '__all__'
 
-class AnimalSerializer(serializers.ModelSerializer):
+class VaccinationSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Animal
+        model = Vaccination
         fields = '__all__'
+        read_only_fields = ['priority', 'created_by', 'created_at']
+
+class DueVaccinationSerializer(serializers.ModelSerializer):
+    animal_name = serializers.CharField(source='animal.name', read_only=True)
+    chip_id = serializers.CharField(source='animal.chip_id', read_only=True)
+    days_until_due = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = LatestVaccination
+        fields = [
+            'animal', 'animal_name', 'chip_id', 'vaccination', 'vaccine_name', 'other_vaccine_name',
+            'date_administered', 'next_due_date', 'days_until_due',
+        ]
+
+class AnimalSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    primary_photo_url = serializers.SerializerMethodField()
+    primary_photo_thumb_url = serializers.SerializerMethodField()
+    vaccination_summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Animal
+        # Listed explicitly: bookkeeping columns (search_document, qr_hash,
+        # qr_attempts, qr_error) stay out of the API
+        fields = [
+            'id', 'chip_id', 'species', 'gender', 'age_numeric', 'age_category', 'name', 'shelter',
+            'injured', 'behavior', 'sterilization_status', 'vaccination_status', 'cage_number',
+            'entry_date', 'capture_location', 'capture_date', 'finder_contact', 'public_visibility',
+            'adoption_status', 'qr_code', 'qr_status', 'primary_photo', 'created_by', 'created_at',
+            'updated_at', 'primary_photo_url', 'primary_photo_thumb_url', 'vaccination_summary',
+        ]
+        expandable_fields = {
+            'photos': AnimalPhotoSerializer,
+            'medical_records': MedicalRecordSerializer,
+        }
+        only_sources = {
+            'primary_photo_url': ['primary_photo', 'primary_photo__image'],
+            'primary_photo_thumb_url': ['primary_photo', 'primary_photo__image', 'primary_photo__renditions'],
+        }
+
+    def get_primary_photo_url(self, obj):
+        photo = obj.primary_photo
+        if not photo or not photo.image:
+            return None
+        return absolute_url(self.context.get('request'), photo.image.url)
+    
+    def get_primary_photo_thumb_url(self, obj):
+        photo = obj.primary_photo
+        if not photo or not photo.image:
+            return None
+        return absolute_url(self.context.get('request'), photo.rendition_url('thumb', 'webp'))
+    
+    def get_vaccination_summary(self, obj):
+        # Lists attach the summaries in bulk (AnimalViewSet.paginate_queryset)
+        return summary_payload(get_vaccination_summary(obj))
+
+class AnimalListSerializer(AnimalSerializer):
+    """Compact representation for list calls (no contact details or QR paths)"""
+
+    class Meta(AnimalSerializer.Meta):
+        fields = [
+            'id', 'chip_id', 'name', 'species', 'gender', 'age_numeric', 'age_category',
+            'cage_number', 'adoption_status', 'public_visibility', 'primary_photo_url',
+            'primary_photo_thumb_url', 'vaccination_summary', 'created_at', 'updated_at',
+        ]
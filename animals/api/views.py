@@ -1,10 +1,21 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, mixins, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
-from ..models import Animal, MedicalRecord, AnimalPhoto
-from .serializers import AnimalSerializer, MedicalRecordSerializer, AnimalPhotoSerializer
+from django.utils import timezone
+from datetime import timedelta
+from ..models import Animal, MedicalRecord, AnimalPhoto, Vaccination
+from .serializers import (
+    AnimalSerializer, AnimalListSerializer, MedicalRecordSerializer, AnimalPhotoSerializer,
+    VaccinationSerializer, DueVaccinationSerializer, query_param_set,
+)
+from .renderers import XLSXRenderer, CSVRenderer, ParquetRenderer
+from .pagination import CreatedAtCursorPagination, UploadedAtCursorPagination, DueDateCursorPagination
+from .filters import AnimalSearchFilter, StableOrderingFilter
+from ..export_utils import export_response
+from ..vaccination_schedule import DEFAULT_UPCOMING_DAYS, due_vaccinations, overdue_vaccinations
+from ..vaccination_status import attach_vaccination_summaries
 
 class IsStaffOrReadOnly(permissions.BasePermission):
     """
@@ -24,13 +35,54 @@ class IsStaffOrReadOnly(permissions.BasePermission):
 class AnimalViewSet(viewsets.ModelViewSet):
     serializer_class = AnimalSerializer
     permission_classes = [IsStaffOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DjangoFilterBackend, AnimalSearchFilter, StableOrderingFilter]
     filterset_fields = ['species', 'gender', 'behavior', 'adoption_status', 'public_visibility', 'shelter']
     search_fields = ['name', 'chip_id', 'capture_location', 'shelter']
+    # ?ordering=name pages by (name, id): see StableOrderingFilter
     ordering_fields = ['created_at', 'name', 'entry_date']
+    ordering = CreatedAtCursorPagination.ordering
+    # Per page, not per animal: summaries and ?expand= relations are loaded in bulk
+    query_budget = 10
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AnimalListSerializer
+        return AnimalSerializer
     
     def get_queryset(self):
-        return Animal.objects.all().prefetch_related('medical_records', 'photos')
+        queryset = Animal.objects.all()
+        
+        # Nested relations are only loaded when requested with ?expand=
+        expand = query_param_set(self.request, 'expand')
+        for relation in AnimalSerializer.Meta.expandable_fields:
+            if relation in expand:
+                queryset = queryset.prefetch_related(relation)
+        
+        if self.action != 'list':
+            return queryset.with_primary_photo()
+        
+        # Lists only load the columns of the (sparse) fieldset
+        serializer_class = self.get_serializer_class()
+        fields = serializer_class(context=self.get_serializer_context()).fields
+        if 'primary_photo_url' in fields or 'primary_photo_thumb_url' in fields:
+            queryset = queryset.with_primary_photo()
+        # The cursor is built from the ordering columns, so they are always loaded
+        return queryset.only(*serializer_class.model_fields_for(fields), *self.ordering_fields)
+    
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and 'vaccination_summary' in self.get_serializer().fields:
+            # One grouped query for the page instead of one per animal
+            page = attach_vaccination_summaries(page)
+        return page
+    
+    @action(detail=False, methods=['get'], renderer_classes=[XLSXRenderer, CSVRenderer, ParquetRenderer])
+    def export(self, request):
+        """Download the filtered animal list: ?format=xlsx (default), csv or parquet"""
+        export_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(Animal.objects.all())
+        return export_response('animals', queryset, export_format, streaming=True)
     
     @action(detail=True, methods=['get'])
     def medical_records(self, request, pk=None):
@@ -39,6 +91,13 @@ class AnimalViewSet(viewsets.ModelViewSet):
         serializer = MedicalRecordSerializer(records, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def vaccinations(self, request, pk=None):
+        animal = self.get_object()
+        vaccinations = animal.vaccinations.by_priority()
+        serializer = VaccinationSerializer(vaccinations, many=True)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['get'])
     def photos(self, request, pk=None):
         animal = self.get_object()
@@ -49,6 +108,8 @@ class AnimalViewSet(viewsets.ModelViewSet):
 class MedicalRecordViewSet(viewsets.ModelViewSet):
     serializer_class = MedicalRecordSerializer
     permission_classes = [IsStaffOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
+    query_budget = 6
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['animal', 'record_type', 'date_recorded']
     search_fields = ['description', 'animal__name', 'animal__chip_id']
@@ -59,8 +120,55 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
 class AnimalPhotoViewSet(viewsets.ModelViewSet):
     serializer_class = AnimalPhotoSerializer
     permission_classes = [IsStaffOrReadOnly]
+    pagination_class = UploadedAtCursorPagination
+    query_budget = 6
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['animal', 'is_primary']
     
     def get_queryset(self):
-        return AnimalPhoto.objects.all().select_related('animal')
\ No newline at end of file
+        return AnimalPhoto.objects.all().select_related('animal')
+
+class VaccinationViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Doses can be recorded but not edited or deleted, as in the admin
+    (VaccinationAdmin): the vaccination history is a legal record.
+    """
+    serializer_class = VaccinationSerializer
+    permission_classes = [IsStaffOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
+    query_budget = 6
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ['animal', 'vaccine_name', 'date_administered']
+    search_fields = ['animal__name', 'animal__chip_id', 'administered_by']
+    
+    def get_queryset(self):
+        return Vaccination.objects.all().select_related('animal')
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+    
+    @action(detail=False, methods=['get'], renderer_classes=[XLSXRenderer, CSVRenderer, ParquetRenderer])
+    def export(self, request):
+        """Download the filtered vaccinations, rabies first: ?format=xlsx (default), csv or parquet"""
+        queryset = self.filter_queryset(Vaccination.objects.by_priority())
+        return export_response('vaccinations', queryset, request.accepted_renderer.format, streaming=True)
+    
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """
+        Latest doses with a next dose due: overdue ones and those due within
+        ?days= (default 14). ?overdue=1 returns only the overdue ones.
+        """
+        try:
+            days = int(request.query_params.get('days', DEFAULT_UPCOMING_DAYS))
+        except ValueError:
+            return Response({'days': 'Must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        include_adopted = request.query_params.get('include_adopted') == '1'
+        if request.query_params.get('overdue') == '1':
+            queryset = overdue_vaccinations(include_adopted=include_adopted)
+        else:
+            until = timezone.localdate() + timedelta(days=days)
+            queryset = due_vaccinations(until, include_adopted=include_adopted)
+        paginator = DueDateCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(DueVaccinationSerializer(page, many=True).data)
@@ -4,3 +4,6 @@ class AnimalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'animals'
     verbose_name = 'Διαχείριση Ζώων'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
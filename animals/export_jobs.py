@@ -0,0 +1,112 @@
+"""
+Background exports. Admin "export all" actions store the primary keys of
+the filtered changelist, in order, in an ExportJob; the process_export_jobs
+command writes the file under MEDIA_ROOT/exports/ so large exports never
+hold a web worker. Running jobs report a heartbeat, and ones left behind by
+a crashed worker are requeued after EXPORT_JOB_STALE_AFTER seconds.
+"""
+import logging
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .export_utils import EXPORT_CHUNK_SIZE, EXPORT_DEFINITIONS, EXPORT_FORMATS
+from .metrics import EXPORT_LATENCY, EXPORT_ROWS, observe_duration
+from .models import Animal, ExportJob, Vaccination
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MODELS = {
+    'animals': Animal,
+    'vaccinations': Vaccination,
+}
+
+
+def enqueue_export(kind, queryset, user=None, format='xlsx'):
+    """Store the primary keys of the queryset for a background export and return the job"""
+    return ExportJob.objects.create(
+        kind=kind,
+        format=format,
+        object_ids=list(queryset.values_list('pk', flat=True)),
+        requested_by=user if user and user.is_authenticated else None,
+    )
+
+
+def iter_job_objects(job):
+    """The job's objects, in chunks and in the order they were queued; deleted rows are skipped"""
+    related = EXPORT_DEFINITIONS[job.kind][2]
+    queryset = EXPORT_MODELS[job.kind]._default_manager.select_related(*related)
+    ids = job.object_ids
+    for start in range(0, len(ids), EXPORT_CHUNK_SIZE):
+        chunk = ids[start:start + EXPORT_CHUNK_SIZE]
+        objects = queryset.in_bulk(chunk)
+        yield from (objects[pk] for pk in chunk if pk in objects)
+
+
+def run_export_job(job):
+    """Write the export file for a claimed (running) job"""
+    sheet_title, columns, _, prefix = EXPORT_DEFINITIONS[job.kind]
+    export_format = EXPORT_FORMATS[job.format]
+    job.total_rows = len(job.object_ids)
+    job.save(update_fields=['total_rows'])
+    
+    def progress(rows):
+        ExportJob.objects.filter(pk=job.pk).update(row_count=rows, heartbeat_at=timezone.now())
+    
+    with tempfile.TemporaryFile() as tmp:
+        objects = iter_job_objects(job)
+        with observe_duration(EXPORT_LATENCY, kind=job.kind, format=job.format, mode='background'):
+            job.row_count = export_format.writer(tmp, sheet_title, columns(), objects, progress)
+        EXPORT_ROWS.labels(job.kind, job.format).inc(job.row_count)
+        tmp.seek(0)
+        stamp = job.created_at.strftime('%Y%m%d_%H%M%S')
+        filename = f'{prefix}_{stamp}_{uuid.uuid4().hex[:8]}.{export_format.extension}'
+        job.file.save(filename, File(tmp), save=False)
+
+
+def requeue_stale_jobs():
+    """Put running jobs whose worker stopped reporting progress back in the queue"""
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_STALE_AFTER)
+    requeued = ExportJob.objects.filter(status='running', heartbeat_at__lt=cutoff).update(
+        status='queued', started_at=None, heartbeat_at=None, row_count=0,
+    )
+    if requeued:
+        logger.warning("Requeued %d export jobs abandoned by their worker", requeued)
+    return requeued
+
+
+def claim_export_job():
+    """Mark the oldest queued job as running and return it (None if the queue is empty)"""
+    requeue_stale_jobs()
+    with transaction.atomic():
+        job = (ExportJob.objects.select_for_update(skip_locked=True)
+               .filter(status='queued').order_by('created_at').first())
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def process_export_job():
+    """Run one queued export; returns False when there was nothing to do"""
+    job = claim_export_job()
+    if job is None:
+        return False
+    
+    try:
+        run_export_job(job)
+        job.status = 'done'
+    except Exception as e:
+        logger.exception("Export job %s failed", job.pk)
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'row_count', 'error', 'finished_at'])
+    return True
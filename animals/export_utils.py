@@ -1,152 +1,285 @@
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse
+from collections import namedtuple
 from datetime import datetime
+import codecs
+import csv
+import io
+import tempfile
 
+from .metrics import EXPORT_LATENCY, EXPORT_ROWS, observe_duration
+from .models import Animal, Vaccination
 
-def export_animals_to_excel(queryset, filename=None):
-    """Export animals queryset to Excel file"""
-    
-    if filename is None:
-        filename = f'animals_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ζώα"
-    
-    # Define headers
-    headers = [
-        'Chip ID', 'Όνομα', 'Είδος', 'Φύλο', 'Ηλικία', 
-        'Συμπεριφορά', 'Στείρωση', 'Τραυματισμένο', 'Κλουβί',
-        'Τοποθεσία Εύρεσης', 'Ημ/νία Εύρεσης', 'Ημ/νία Εισόδου',
-        'Κατάσταση Υιοθεσίας', 'Δημόσια Προβολή', 'Καταφύγιο',
-        'Δημιουργήθηκε Από', 'Δημιουργήθηκε Στις'
-    ]
-    
-    # Write headers with styling
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="417690", end_color="417690", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Write data
-    for row_num, animal in enumerate(queryset, 2):
-        ws.cell(row=row_num, column=1).value = animal.chip_id
-        ws.cell(row=row_num, column=2).value = animal.name
-        ws.cell(row=row_num, column=3).value = animal.get_species_display()
-        ws.cell(row=row_num, column=4).value = animal.get_gender_display()
-        
-        # Age
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched from the database per round-trip while exporting
+EXPORT_CHUNK_SIZE = 500
+
+# Column widths are measured on the first rows only; they must be written
+# before any row data in write-only mode, so only this many rows are buffered
+WIDTH_SAMPLE_ROWS = 500
+
+
+def _format_date(value, fmt='%d/%m/%Y'):
+    return value.strftime(fmt) if value else ""
+
+
+def _yes_no(value):
+    return "Ναι" if value else "Όχι"
+
+
+def animal_columns():
+    """
+    (header, value getter) pairs for animals, in column order.
+    Choice labels are looked up in dicts built once per export instead of
+    calling get_*_display() for every row.
+    """
+    species = dict(Animal.SPECIES_CHOICES)
+    gender = dict(Animal.GENDER_CHOICES)
+    age_category = dict(Animal.AGE_CATEGORY_CHOICES)
+    behavior = dict(Animal.BEHAVIOR_CHOICES)
+    sterilization = dict(Animal.STERILIZATION_CHOICES)
+    adoption_status = dict(Animal.ADOPTION_STATUS_CHOICES)
+
+    def age(animal):
         if animal.age_numeric:
-            ws.cell(row=row_num, column=5).value = f"{animal.age_numeric} έτη"
+            return f"{animal.age_numeric} έτη"
         elif animal.age_category:
-            ws.cell(row=row_num, column=5).value = animal.get_age_category_display()
-        else:
-            ws.cell(row=row_num, column=5).value = "Μη καθορισμένη"
-        
-        ws.cell(row=row_num, column=6).value = animal.get_behavior_display() if animal.behavior else ""
-        ws.cell(row=row_num, column=7).value = animal.get_sterilization_status_display() if animal.sterilization_status else ""
-        ws.cell(row=row_num, column=8).value = "Ναι" if animal.injured else "Όχι"
-        ws.cell(row=row_num, column=9).value = animal.cage_number or ""
-        ws.cell(row=row_num, column=10).value = animal.capture_location or ""
-        ws.cell(row=row_num, column=11).value = animal.capture_date.strftime('%d/%m/%Y') if animal.capture_date else ""
-        ws.cell(row=row_num, column=12).value = animal.entry_date.strftime('%d/%m/%Y') if animal.entry_date else ""
-        ws.cell(row=row_num, column=13).value = animal.get_adoption_status_display()
-        ws.cell(row=row_num, column=14).value = "Ναι" if animal.public_visibility else "Όχι"
-        ws.cell(row=row_num, column=15).value = animal.shelter or ""
-        ws.cell(row=row_num, column=16).value = str(animal.created_by) if animal.created_by else ""
-        ws.cell(row=row_num, column=17).value = animal.created_at.strftime('%d/%m/%Y %H:%M') if animal.created_at else ""
-    
-    # Auto-size columns
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-    
-    # Freeze header row
-    ws.freeze_panes = 'A2'
-    
+            return age_category.get(animal.age_category, animal.age_category)
+        return "Μη καθορισμένη"
+
+    return [
+        ('Chip ID', lambda a: a.chip_id),
+        ('Όνομα', lambda a: a.name),
+        ('Είδος', lambda a: species.get(a.species, a.species)),
+        ('Φύλο', lambda a: gender.get(a.gender, a.gender)),
+        ('Ηλικία', age),
+        ('Συμπεριφορά', lambda a: behavior.get(a.behavior, a.behavior) if a.behavior else ""),
+        ('Στείρωση', lambda a: sterilization.get(a.sterilization_status, a.sterilization_status) if a.sterilization_status else ""),
+        ('Τραυματισμένο', lambda a: _yes_no(a.injured)),
+        ('Κλουβί', lambda a: a.cage_number or ""),
+        ('Τοποθεσία Εύρεσης', lambda a: a.capture_location or ""),
+        ('Ημ/νία Εύρεσης', lambda a: _format_date(a.capture_date)),
+        ('Ημ/νία Εισόδου', lambda a: _format_date(a.entry_date)),
+        ('Κατάσταση Υιοθεσίας', lambda a: adoption_status.get(a.adoption_status, a.adoption_status)),
+        ('Δημόσια Προβολή', lambda a: _yes_no(a.public_visibility)),
+        ('Καταφύγιο', lambda a: a.shelter or ""),
+        ('Δημιουργήθηκε Από', lambda a: str(a.created_by) if a.created_by else ""),
+        ('Δημιουργήθηκε Στις', lambda a: _format_date(a.created_at, '%d/%m/%Y %H:%M')),
+    ]
+
+
+def vaccination_columns():
+    """(header, value getter) pairs for vaccinations, in column order"""
+    species = dict(Animal.SPECIES_CHOICES)
+    vaccines = dict(Vaccination.VACCINE_CHOICES)
+
+    return [
+        ('Όνομα Ζώου', lambda v: v.animal.name),
+        ('Chip ID', lambda v: v.animal.chip_id),
+        ('Είδος', lambda v: species.get(v.animal.species, v.animal.species)),
+        ('Εμβόλιο', lambda v: vaccines.get(v.vaccine_name, v.vaccine_name)),
+        ('Σκεύασμα', lambda v: v.other_vaccine_name or ""),
+        ('Αρ. Παρτίδας', lambda v: v.batch_number or ""),
+        ('Ημ/νία Χορήγησης', lambda v: _format_date(v.date_administered)),
+        ('Επόμενη Ημ/νία', lambda v: _format_date(v.next_due_date)),
+        ('Κτηνίατρος', lambda v: v.administered_by or ""),
+        ('Δημιουργήθηκε Από', lambda v: str(v.created_by) if v.created_by else ""),
+        ('Δημιουργήθηκε Στις', lambda v: _format_date(v.created_at, '%d/%m/%Y %H:%M')),
+    ]
+
+
+# kind -> (sheet title, columns factory, select_related fields, filename prefix)
+EXPORT_DEFINITIONS = {
+    'animals': ("Ζώα", animal_columns, ['created_by'], 'animals_export'),
+    'vaccinations': ("Εμβολιασμοί", vaccination_columns, ['animal', 'created_by'], 'vaccinations_export'),
+}
+
+ExportFormat = namedtuple('ExportFormat', ['name', 'extension', 'content_type', 'writer'])
+
+# format name -> ExportFormat, filled by @register_format
+EXPORT_FORMATS = {}
+
+
+def register_format(name, extension, content_type):
+    """Register a writer(fileobj, sheet_title, columns, objects, progress=None) -> row count"""
+    def decorator(writer):
+        EXPORT_FORMATS[name] = ExportFormat(name, extension, content_type, writer)
+        return writer
+    return decorator
+
+
+def export_filename(kind, extension='xlsx'):
+    prefix = EXPORT_DEFINITIONS[kind][3]
+    return f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def iter_export_objects(kind, queryset):
+    """Iterate the queryset in chunks with the relations the columns need"""
+    related = EXPORT_DEFINITIONS[kind][2]
+    return queryset.select_related(*related).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+@register_format('xlsx', 'xlsx', XLSX_CONTENT_TYPE)
+def write_xlsx(fileobj, sheet_title, columns, objects, progress=None):
+    """
+    Write objects to fileobj as an xlsx sheet using openpyxl's write-only mode.
+    Memory use does not depend on the number of rows. Returns the row count.
+    progress, if given, is called with the number of rows written so far.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="417690", end_color="417690", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    header_row = []
+    for header, _ in columns:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_row.append(cell)
+
+    widths = [len(header) for header, _ in columns]
+    getters = [getter for _, getter in columns]
+    buffered = []
+    row_count = 0
+
+    def flush_buffer():
+        # Widths and frozen header must be set before the first row is written
+        for col_num, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = min(width + 2, 50)
+        ws.freeze_panes = 'A2'
+        ws.append(header_row)
+        for row in buffered:
+            ws.append(row)
+        buffered.clear()
+
+    sampling = True
+    for obj in objects:
+        row = [getter(obj) for getter in getters]
+        row_count += 1
+        if progress and row_count % EXPORT_CHUNK_SIZE == 0:
+            progress(row_count)
+        if not sampling:
+            ws.append(row)
+            continue
+        for index, value in enumerate(row):
+            if value:
+                widths[index] = max(widths[index], len(str(value)))
+        buffered.append(row)
+        if len(buffered) >= WIDTH_SAMPLE_ROWS:
+            flush_buffer()
+            sampling = False
+    if sampling:
+        flush_buffer()
+
     # Enable filters
-    ws.auto_filter.ref = ws.dimensions
-    
-    # Prepare response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    ws.auto_filter.ref = f'A1:{get_column_letter(len(columns))}{row_count + 1}'
+
+    wb.save(fileobj)
+    return row_count
+
+
+@register_format('csv', 'csv', 'text/csv; charset=utf-8')
+def write_csv(fileobj, sheet_title, columns, objects, progress=None):
+    """Write objects as UTF-8 CSV, flushing to fileobj every EXPORT_CHUNK_SIZE rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    getters = [getter for _, getter in columns]
+
+    # The BOM lets Excel detect UTF-8 (Greek text)
+    fileobj.write(codecs.BOM_UTF8)
+    writer.writerow([header for header, _ in columns])
+    row_count = 0
+    for obj in objects:
+        writer.writerow([getter(obj) for getter in getters])
+        row_count += 1
+        if row_count % EXPORT_CHUNK_SIZE == 0:
+            fileobj.write(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+            if progress:
+                progress(row_count)
+    fileobj.write(buffer.getvalue().encode('utf-8'))
+    return row_count
+
+
+@register_format('parquet', 'parquet', 'application/vnd.apache.parquet')
+def write_parquet(fileobj, sheet_title, columns, objects, progress=None):
+    """Write objects as a Parquet file, one row group per EXPORT_CHUNK_SIZE rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    headers = [header for header, _ in columns]
+    getters = [getter for _, getter in columns]
+    # Values are the same display strings as the other formats
+    schema = pa.schema([(header, pa.string()) for header in headers])
+    row_count = 0
+
+    with pq.ParquetWriter(fileobj, schema, compression='snappy') as writer:
+        batch = [[] for _ in columns]
+
+        def write_batch():
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=pa.string()) for values in batch], schema=schema
+            ))
+            for values in batch:
+                values.clear()
+
+        for obj in objects:
+            for values, getter in zip(batch, getters):
+                value = getter(obj)
+                values.append(str(value) if value not in (None, "") else None)
+            row_count += 1
+            if row_count % EXPORT_CHUNK_SIZE == 0:
+                write_batch()
+                if progress:
+                    progress(row_count)
+        if batch[0] or row_count == 0:
+            write_batch()
+    return row_count
+
+
+def export_response(kind, queryset, format='xlsx', filename=None, streaming=False):
+    """
+    Export a queryset of the given kind (see EXPORT_DEFINITIONS) in one of
+    EXPORT_FORMATS as a download response.
+    With streaming=True the file is spooled to disk and streamed, for large exports.
+    """
+    sheet_title, columns, _, _ = EXPORT_DEFINITIONS[kind]
+    export_format = EXPORT_FORMATS[format]
+    if filename is None:
+        filename = export_filename(kind, export_format.extension)
+    objects = iter_export_objects(kind, queryset)
+
+    def write(fileobj):
+        with observe_duration(EXPORT_LATENCY, kind=kind, format=format, mode='inline'):
+            rows = export_format.writer(fileobj, sheet_title, columns(), objects)
+        EXPORT_ROWS.labels(kind, format).inc(rows)
+
+    if streaming:
+        # Spool to an anonymous temp file and stream it back in chunks
+        tmp = tempfile.TemporaryFile()
+        write(tmp)
+        tmp.seek(0)
+        return FileResponse(tmp, as_attachment=True, filename=filename, content_type=export_format.content_type)
+
+    response = HttpResponse(content_type=export_format.content_type)
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    
+    write(response)
     return response
 
 
-def export_vaccinations_to_excel(queryset, filename=None):
+def export_animals_to_excel(queryset, filename=None, streaming=False):
+    """Export animals queryset to Excel file"""
+    return export_response('animals', queryset, 'xlsx', filename, streaming)
+
+
+def export_vaccinations_to_excel(queryset, filename=None, streaming=False):
     """Export vaccinations queryset to Excel file"""
-    
-    if filename is None:
-        filename = f'vaccinations_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Εμβολιασμοί"
-    
-    # Define headers
-    headers = [
-        'Όνομα Ζώου', 'Chip ID', 'Είδος',
-        'Εμβόλιο', 'Σκεύασμα', 'Αρ. Παρτίδας',
-        'Ημ/νία Χορήγησης', 'Επόμενη Ημ/νία', 'Κτηνίατρος',
-        'Δημιουργήθηκε Από', 'Δημιουργήθηκε Στις'
-    ]
-    
-    # Write headers with styling
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="417690", end_color="417690", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Write data
-    for row_num, vaccination in enumerate(queryset.select_related('animal'), 2):
-        ws.cell(row=row_num, column=1).value = vaccination.animal.name
-        ws.cell(row=row_num, column=2).value = vaccination.animal.chip_id
-        ws.cell(row=row_num, column=3).value = vaccination.animal.get_species_display()
-        ws.cell(row=row_num, column=4).value = vaccination.get_vaccine_name_display()
-        ws.cell(row=row_num, column=5).value = vaccination.other_vaccine_name or ""
-        ws.cell(row=row_num, column=6).value = vaccination.batch_number or ""
-        ws.cell(row=row_num, column=7).value = vaccination.date_administered.strftime('%d/%m/%Y') if vaccination.date_administered else ""
-        ws.cell(row=row_num, column=8).value = vaccination.next_due_date.strftime('%d/%m/%Y') if vaccination.next_due_date else ""
-        ws.cell(row=row_num, column=9).value = vaccination.administered_by or ""
-        ws.cell(row=row_num, column=10).value = str(vaccination.created_by) if vaccination.created_by else ""
-        ws.cell(row=row_num, column=11).value = vaccination.created_at.strftime('%d/%m/%Y %H:%M') if vaccination.created_at else ""
-    
-    # Auto-size columns
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-    
-    # Freeze header row
-    ws.freeze_panes = 'A2'
-    
-    # Enable filters
-    ws.auto_filter.ref = ws.dimensions
-    
-    # Prepare response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    
-    return response
\ No newline at end of file
+    return export_response('vaccinations', queryset, 'xlsx', filename, streaming)
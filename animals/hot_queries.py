@@ -0,0 +1,96 @@
+"""
+Queries behind the busiest pages, endpoints and workers, in the shape the
+application builds them. The explain_hot_queries command runs EXPLAIN on
+each one and flags any that fall back to a sequential scan.
+"""
+import re
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Animal, ExportJob, QRCodeJob, Vaccination
+from .search import search_animals
+from .vaccination_schedule import overdue_vaccinations
+
+# name -> function returning the queryset, filled by @register_hot_query
+HOT_QUERIES = {}
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # "SCAN table" is a full table scan, "SCAN table USING INDEX ..." is not
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)\s*$', re.MULTILINE),
+}
+
+
+def register_hot_query(name):
+    def decorator(func):
+        HOT_QUERIES[name] = func
+        return func
+    return decorator
+
+
+def find_seq_scans(plan, vendor):
+    """Tables read with a sequential scan according to an EXPLAIN plan"""
+    pattern = SEQ_SCAN_PATTERNS.get(vendor)
+    return sorted(set(pattern.findall(plan))) if pattern else []
+
+
+@register_hot_query('public_adoption_list')
+def public_adoption_list():
+    return Animal.objects.publicly_listed().with_primary_photo().order_by('-created_at')[:12]
+
+
+@register_hot_query('public_animal_detail')
+def public_animal_detail():
+    return Animal.objects.filter(pk=1, public_visibility=True).values_list('updated_at', flat=True)
+
+
+@register_hot_query('chip_lookup')
+def chip_lookup():
+    return Animal.objects.with_primary_photo().filter(chip_id='000000000000001')
+
+
+@register_hot_query('staff_list_by_status')
+def staff_list_by_status():
+    return Animal.objects.filter(adoption_status='available').order_by('-created_at')[:20]
+
+
+@register_hot_query('api_animals_cursor')
+def api_animals_cursor():
+    return Animal.objects.filter(created_at__lt=timezone.now()).order_by('-created_at', '-id')[:21]
+
+
+@register_hot_query('animal_search')
+def animal_search():
+    return search_animals(Animal.objects.all(), 'ρεξ')[:20]
+
+
+@register_hot_query('vaccinations_by_vaccine')
+def vaccinations_by_vaccine():
+    return Vaccination.objects.filter(vaccine_name='rabies').order_by('-date_administered')[:100]
+
+
+@register_hot_query('vaccinations_admin_list')
+def vaccinations_admin_list():
+    return Vaccination.objects.select_related('animal').by_priority()[:100]
+
+
+@register_hot_query('vaccinations_by_date')
+def vaccinations_by_date():
+    since = timezone.now().date() - timedelta(days=7)
+    return Vaccination.objects.filter(date_administered__gte=since).order_by('-date_administered')[:100]
+
+
+@register_hot_query('overdue_vaccinations')
+def overdue_vaccinations_list():
+    return overdue_vaccinations()
+
+
+@register_hot_query('qr_queue_claim')
+def qr_queue_claim():
+    return QRCodeJob.objects.filter(run_after__lte=timezone.now())[:20]
+
+
+@register_hot_query('export_queue_claim')
+def export_queue_claim():
+    return ExportJob.objects.filter(status='queued').order_by('created_at')[:1]
@@ -0,0 +1,284 @@
+"""
+chip_id -> serialized payload cache for the QR scan/lookup endpoints.
+
+Two layers: a small in-process LRU with a short TTL, and optionally a
+shared Django cache (the file based default cache is shared by all
+gunicorn workers). Entries are invalidated by Animal/AnimalPhoto signals;
+other workers' in-process copies expire after QR_LOOKUP_CACHE_TTL.
+Missing chip IDs are cached too, since creating the animal invalidates them.
+
+Shared entries are keyed by a per-chip generation that invalidation
+replaces, so a payload built while the animal changed is written under the
+old generation, where nobody reads it. In-process, a build that overlapped
+an invalidation is not stored.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import CHIP_LOOKUP_CACHE
+from .models import Animal
+from .vaccination_status import attach_vaccination_summaries, get_vaccination_summary, summary_payload
+
+# Stored for chip IDs that do not exist (None means "not cached")
+NOT_FOUND = 'not_found'
+
+VARIANTS = ('staff', 'public')
+
+# stats() counter -> shelter_chip_lookup_cache_total result label
+METRIC_RESULTS = {'local_hits': 'local_hit', 'shared_hits': 'shared_hit', 'misses': 'miss'}
+
+
+def staff_payload(animal):
+    """Full animal info for staff scans"""
+    photo = animal.primary_photo
+    vaccination = summary_payload(get_vaccination_summary(animal))
+    return {
+        'id': animal.id,
+        'chip_id': animal.chip_id,
+        'name': animal.name,
+        'species': animal.get_species_display(),
+        'gender': animal.get_gender_display(),
+        'age': animal.age_numeric if animal.age_numeric else animal.get_age_category_display(),
+        'cage_number': animal.cage_number,
+        'behavior': animal.get_behavior_display(),
+        'vaccination_status': vaccination['status_display'],
+        'vaccination': vaccination,
+        'sterilization_status': animal.get_sterilization_status_display(),
+        'adoption_status': animal.get_adoption_status_display(),
+        'injured': animal.injured,
+        'photo_url': photo.rendition_url('card', generate=False) if photo else None,
+        'public_url': f'/adopt/{animal.id}/' if animal.public_visibility else None,
+        'entry_date': animal.entry_date.strftime('%Y-%m-%d'),
+    }
+
+
+def public_payload(animal):
+    """Public info; URLs are relative and made absolute per request"""
+    # Only return public info for non-public animals
+    if not animal.public_visibility:
+        return {
+            'chip_id': animal.chip_id,
+            'name': animal.name,
+            'species': animal.get_species_display(),
+            'status': 'Registered in shelter system',
+            'message': 'Contact shelter for more information'
+        }
+
+    photo = animal.primary_photo
+    return {
+        'chip_id': animal.chip_id,
+        'name': animal.name,
+        'species': animal.get_species_display(),
+        'gender': animal.get_gender_display(),
+        'age': animal.age_numeric if animal.age_numeric else animal.get_age_category_display(),
+        'adoption_status': animal.get_adoption_status_display(),
+        'photo_url': photo.rendition_url('card', generate=False) if photo else None,
+        'public_url': f'/adopt/{animal.id}/',
+    }
+
+
+PAYLOAD_BUILDERS = {
+    'staff': staff_payload,
+    'public': public_payload,
+}
+
+
+class ChipLookupCache:
+    """Thread-safe LRU with per-entry TTL plus an optional shared cache layer"""
+
+    def __init__(self, max_entries, ttl, shared_alias=None, shared_ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+        # Bumped by invalidate(); builds that overlap one are not stored
+        self._invalidations = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _generation_key(self, chip_id):
+        return f'animals:chip:generation:{chip_id}'
+
+    def _shared_key(self, variant, chip_id, generation):
+        return f'animals:chip:{variant}:{chip_id}:{generation}'
+
+    def _generations(self, chip_ids):
+        """{chip_id: current generation}, starting a new one for chip IDs without"""
+        shared = self.shared
+        generations = shared.get_many([self._generation_key(chip_id) for chip_id in chip_ids])
+        result = {}
+        for chip_id in chip_ids:
+            generation = generations.get(self._generation_key(chip_id))
+            if generation is None:
+                generation = time.time_ns()
+                shared.add(self._generation_key(chip_id), generation, None)
+                generation = shared.get(self._generation_key(chip_id), generation)
+            result[chip_id] = generation
+        return result
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+        CHIP_LOOKUP_CACHE.labels(METRIC_RESULTS[name]).inc()
+
+    def _local_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                return None
+            self._entries.move_to_end(key)
+            self._counters['local_hits'] += 1
+        CHIP_LOOKUP_CACHE.labels('local_hit').inc()
+        return entry[0]
+
+    def get(self, variant, chip_id):
+        """Return the cached payload (or NOT_FOUND), building it on a miss"""
+        key = (variant, chip_id)
+        now = time.monotonic()
+        payload = self._local_get(key, now)
+        if payload is not None:
+            return payload
+
+        invalidations = self._invalidations
+        shared = self.shared
+        if shared is not None:
+            shared_key = self._shared_key(variant, chip_id, self._generations([chip_id])[chip_id])
+            payload = shared.get(shared_key)
+        if payload is not None:
+            self._count('shared_hits')
+        else:
+            self._count('misses')
+            payload = self._build(variant, chip_id)
+            if shared is not None:
+                shared.set(shared_key, payload, self.shared_ttl)
+
+        self._store(key, payload, now, invalidations)
+        return payload
+
+    async def aget(self, variant, chip_id):
+        """
+        get() for async views. Local hits need no thread; anything else runs
+        get() in one sync_to_async call, since the shared cache and the ORM
+        are sync underneath anyway.
+        """
+        payload = self._local_get((variant, chip_id), time.monotonic())
+        if payload is not None:
+            return payload
+        return await sync_to_async(self.get)(variant, chip_id)
+
+    def get_many(self, variant, chip_ids):
+        """
+        Return {chip_id: payload or NOT_FOUND}. Everything missing from both
+        cache layers is loaded with a single chip_id__in query.
+        """
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for chip_id in chip_ids:
+                entry = self._entries.get((variant, chip_id))
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end((variant, chip_id))
+                    self._counters['local_hits'] += 1
+                    result[chip_id] = entry[0]
+        if result:
+            CHIP_LOOKUP_CACHE.labels('local_hit').inc(len(result))
+
+        invalidations = self._invalidations
+        shared = self.shared
+        missing = [chip_id for chip_id in chip_ids if chip_id not in result]
+        if missing and shared is not None:
+            generations = self._generations(missing)
+            shared_keys = {chip_id: self._shared_key(variant, chip_id, generations[chip_id]) for chip_id in missing}
+            cached = shared.get_many(list(shared_keys.values()))
+            for chip_id in missing:
+                payload = cached.get(shared_keys[chip_id])
+                if payload is not None:
+                    self._count('shared_hits')
+                    result[chip_id] = payload
+                    self._store((variant, chip_id), payload, now, invalidations)
+            missing = [chip_id for chip_id in missing if chip_id not in result]
+
+        if missing:
+            animals = Animal.objects.with_primary_photo().filter(chip_id__in=missing)
+            if variant == 'staff':
+                # One grouped query for the whole batch
+                animals = attach_vaccination_summaries(animals)
+            animals = {animal.chip_id: animal for animal in animals}
+            built = {}
+            for chip_id in missing:
+                self._count('misses')
+                animal = animals.get(chip_id)
+                payload = PAYLOAD_BUILDERS[variant](animal) if animal else NOT_FOUND
+                result[chip_id] = payload
+                if shared is not None:
+                    built[shared_keys[chip_id]] = payload
+                self._store((variant, chip_id), payload, now, invalidations)
+            if built:
+                shared.set_many(built, self.shared_ttl)
+
+        return result
+
+    def _build(self, variant, chip_id):
+        animal = Animal.objects.with_primary_photo().filter(chip_id=chip_id).first()
+        if animal is None:
+            return NOT_FOUND
+        return PAYLOAD_BUILDERS[variant](animal)
+
+    def _store(self, key, payload, now, invalidations):
+        """Keep a payload unless an invalidation ran since `invalidations` was read"""
+        with self._lock:
+            if self._invalidations != invalidations:
+                return
+            self._entries[key] = (payload, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, chip_ids):
+        chip_ids = list(chip_ids)
+        self._invalidate(chip_ids)
+        if transaction.get_connection().in_atomic_block:
+            # Until the commit, concurrent builds still read the old rows
+            transaction.on_commit(lambda: self._invalidate(chip_ids))
+
+    def _invalidate(self, chip_ids):
+        with self._lock:
+            self._invalidations += 1
+            for chip_id in chip_ids:
+                for variant in VARIANTS:
+                    self._entries.pop((variant, chip_id), None)
+        if self.shared is not None and chip_ids:
+            # A new generation orphans the cached payloads, including ones still being built
+            generation = time.time_ns()
+            self.shared.set_many({self._generation_key(chip_id): generation for chip_id in chip_ids}, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, size=len(self._entries))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else None
+        return stats
+
+
+chip_lookup_cache = ChipLookupCache(
+    max_entries=settings.QR_LOOKUP_CACHE_MAX_ENTRIES,
+    ttl=settings.QR_LOOKUP_CACHE_TTL,
+    shared_alias=settings.QR_LOOKUP_SHARED_CACHE or None,
+    shared_ttl=settings.QR_LOOKUP_SHARED_CACHE_TTL,
+)
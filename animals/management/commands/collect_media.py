@@ -0,0 +1,107 @@
+import os
+import posixpath
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from animals.models import AnimalPhoto
+from animals.renditions import RENDITIONS_DIR, rendition_paths
+from animals.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Delete media files (content-addressed uploads and photo renditions) that no row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be deleted')
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Only delete files older than this many hours (protects in-flight uploads)'
+        )
+
+    def handle(self, *args, **options):
+        referenced = self.referenced_files()
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+        self.stdout.write(f'{len(referenced)} files referenced by the database.')
+
+        checked = deleted = freed = 0
+        for storage, directory in self.collected_directories():
+            for name in self.walk(storage, directory):
+                checked += 1
+                if name in referenced or storage.get_modified_time(name) > cutoff:
+                    continue
+                # An upload may have reused the file since the snapshot (saving
+                # a duplicate refreshes its mtime): check again right before deleting
+                if self.is_referenced(name) or storage.get_modified_time(name) > cutoff:
+                    continue
+                size = storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(f'  would delete {name} ({size} bytes)')
+                else:
+                    storage.delete(name)
+                deleted += 1
+                freed += size
+            if not options['dry_run']:
+                self.remove_empty_directories(storage, directory)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} of {checked} files ({freed} bytes).'
+        ))
+
+    def file_fields(self):
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    yield model, field
+
+    def referenced_files(self):
+        """Names stored in every file field of every model, plus the photo renditions"""
+        referenced = set()
+        for model, field in self.file_fields():
+            referenced.update(
+                model._base_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                .values_list(field.name, flat=True).iterator()
+            )
+        for renditions in AnimalPhoto.objects.exclude(renditions={}).values_list('renditions', flat=True).iterator():
+            referenced.update(rendition_paths(renditions))
+        return referenced
+
+    def is_referenced(self, name):
+        """referenced_files() for a single file, read now"""
+        parts = name.split('/')
+        if parts[0] == RENDITIONS_DIR:
+            # renditions/<photo pk>/...
+            if len(parts) < 3 or not parts[1].isdigit():
+                return False
+            renditions = AnimalPhoto.objects.filter(pk=parts[1]).values_list('renditions', flat=True).first()
+            return bool(renditions) and name in rendition_paths(renditions)
+        return any(model._base_manager.filter(**{field.name: name}).exists() for model, field in self.file_fields())
+
+    def collected_directories(self):
+        """(storage, directory) pairs whose files are only ever reachable through the database"""
+        directories = set()
+        for model, field in self.file_fields():
+            if isinstance(field.storage, ContentAddressedStorage):
+                directories.add((field.storage, field.upload_to.rstrip('/')))
+        directories.add((default_storage, RENDITIONS_DIR))
+        return sorted(directories, key=lambda item: item[1])
+
+    def walk(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        subdirectories, files = storage.listdir(directory)
+        for filename in files:
+            yield posixpath.join(directory, filename)
+        for subdirectory in subdirectories:
+            yield from self.walk(storage, posixpath.join(directory, subdirectory))
+
+    def remove_empty_directories(self, storage, directory):
+        root = storage.path(directory)
+        for path, _, _ in os.walk(root, topdown=False):
+            if path != root and not os.listdir(path):
+                os.rmdir(path)
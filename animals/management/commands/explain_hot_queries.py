@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from animals.hot_queries import HOT_QUERIES, find_seq_scans
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN ANALYZE on the registered hot queries and flag sequential scans'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Queries to check (default: all)')
+        parser.add_argument('--no-analyze', action='store_true', help='Plain EXPLAIN, without executing the queries')
+        parser.add_argument(
+            '--allow-seqscan', action='store_true',
+            help='Let the planner pick sequential scans. By default they are disabled (PostgreSQL), '
+                 'so a Seq Scan in the plan means no index can serve the query, even on small tables.'
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only flagged ones')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if any query is flagged (for CI)')
+    
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(HOT_QUERIES)
+        if unknown:
+            raise CommandError(f'Unknown queries: {", ".join(sorted(unknown))}. Available: {", ".join(HOT_QUERIES)}')
+        names = options['names'] or list(HOT_QUERIES)
+        vendor = connection.vendor
+        analyze = not options['no_analyze'] and vendor == 'postgresql'
+        
+        flagged = []
+        for name in names:
+            plan = self.explain(HOT_QUERIES[name](), analyze, options['allow_seqscan'])
+            seq_scans = find_seq_scans(plan, vendor)
+            if seq_scans:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f'{name}: sequential scan on {", ".join(seq_scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+            if seq_scans or options['verbose_plans']:
+                self.stdout.write(plan + '\n')
+        
+        if flagged and options['fail']:
+            raise CommandError(f'{len(flagged)} hot queries use sequential scans: {", ".join(flagged)}')
+        self.stdout.write(f'Done: {len(names)} queries checked, {len(flagged)} flagged.')
+    
+    def explain(self, queryset, analyze, allow_seqscan):
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        # SET LOCAL only lasts until the end of this transaction
+        with transaction.atomic():
+            if not allow_seqscan:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain(analyze=analyze, buffers=analyze)
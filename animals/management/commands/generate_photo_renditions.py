@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from animals.models import AnimalPhoto
+from animals.renditions import ERROR_KEY, generate_renditions, renditions_current
+
+
+class Command(BaseCommand):
+    help = 'Generate the WebP/JPEG renditions of animal photos that are missing or out of date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animal', type=int, action='append', help='Only photos of this animal id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Photos loaded per query')
+        parser.add_argument('--force', action='store_true', help='Regenerate even when the renditions are current or the photo failed before')
+
+    def handle(self, *args, **options):
+        queryset = AnimalPhoto.objects.exclude(image='').order_by('pk')
+        if options['animal']:
+            queryset = queryset.filter(animal_id__in=options['animal'])
+
+        total = queryset.count()
+        self.stdout.write(f'Checking renditions for {total} photos...')
+
+        processed = generated = skipped = failed = 0
+        for photo in queryset.iterator(chunk_size=options['chunk_size']):
+            processed += 1
+            if not options['force'] and renditions_current(photo):
+                if ERROR_KEY in photo.renditions:
+                    failed += 1
+                    self.stderr.write(f'  Photo {photo.pk} failed before ({photo.renditions[ERROR_KEY]}), use --force to retry')
+                else:
+                    skipped += 1
+            elif generate_renditions(photo):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f'  Could not read photo {photo.pk} ({photo.image.name})')
+            if processed % options['chunk_size'] == 0:
+                self.stdout.write(f'  {processed}/{total} (generated {generated}, current {skipped})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {processed} photos checked, {generated} generated, {skipped} current, {failed} failed.'
+        ))
@@ -1,17 +1,93 @@
-#!/usr/bin/env python
-"""Django's command-line utility for administrative tasks."""
 import os
-import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
 
-if __name__ == '__main__':
-    """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shelter_registry.settings')
-    try:
-        from django.core.management import execute_from_command_line
-    except ImportError as exc:
-        raise ImportError(
-            "Couldn't import Django. Are you sure it's installed and "
-            "available on your PYTHONPATH environment variable? Did you "
-            "forget to activate a virtual environment?"
-        ) from exc
-    execute_from_command_line(sys.argv)
\ No newline at end of file
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from animals.models import Animal, QRCodeJob
+from animals.public_cache import bump_catalog_version
+from animals.qr_codes import render_qr_png, qr_data_hash
+
+
+class Command(BaseCommand):
+    help = 'Regenerate animal QR codes in parallel, skipping animals whose QR payload is unchanged'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--only-missing', action='store_true', help='Only animals without a QR code image')
+        parser.add_argument('--since', help='Only animals updated on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes (1 renders in-process)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Animals rendered and bulk-updated per chunk')
+        parser.add_argument('--force', action='store_true', help='Render even when the stored QR matches the payload')
+    
+    def handle(self, *args, **options):
+        queryset = Animal.objects.order_by('pk')
+        if options['only_missing']:
+            queryset = queryset.filter(Q(qr_code__isnull=True) | Q(qr_code=''))
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            queryset = queryset.filter(updated_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+        
+        total = queryset.count()
+        self.stdout.write(f'Checking QR codes for {total} animals...')
+        
+        executor = ProcessPoolExecutor(max_workers=options['workers']) if options['workers'] > 1 else None
+        processed = rendered = skipped = 0
+        try:
+            chunk = []
+            for animal in queryset.iterator(chunk_size=options['chunk_size']):
+                chunk.append(animal)
+                if len(chunk) >= options['chunk_size']:
+                    r, s = self.process_chunk(chunk, executor, options['force'])
+                    processed, rendered, skipped = processed + len(chunk), rendered + r, skipped + s
+                    chunk = []
+                    self.stdout.write(f'  {processed}/{total} (rendered {rendered}, unchanged {skipped})')
+            if chunk:
+                r, s = self.process_chunk(chunk, executor, options['force'])
+                processed, rendered, skipped = processed + len(chunk), rendered + r, skipped + s
+        finally:
+            if executor:
+                executor.shutdown()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {processed} animals checked, {rendered} QR codes rendered, {skipped} unchanged.'
+        ))
+    
+    def process_chunk(self, animals, executor, force):
+        """Render the chunk's changed QR codes and bulk_update them; returns (rendered, skipped)"""
+        pending = []
+        for animal in animals:
+            qr_data = animal.get_qr_data()
+            qr_hash = qr_data_hash(qr_data)
+            if not force and animal.qr_code and animal.qr_hash == qr_hash:
+                continue
+            pending.append((animal, qr_data, qr_hash))
+        
+        if not pending:
+            return 0, len(animals)
+        
+        payloads = [qr_data for _, qr_data, _ in pending]
+        if executor:
+            images = executor.map(render_qr_png, payloads, chunksize=max(1, len(payloads) // 8))
+        else:
+            images = map(render_qr_png, payloads)
+        
+        for (animal, _, qr_hash), png in zip(pending, images):
+            animal.store_qr_png(png)
+            animal.qr_hash = qr_hash
+            animal.qr_status = 'ready'
+            animal.qr_error = ''
+            animal.updated_at = timezone.now()
+        
+        updated = [animal for animal, _, _ in pending]
+        with transaction.atomic():
+            Animal.objects.bulk_update(updated, ['qr_code', 'qr_hash', 'qr_status', 'qr_error', 'updated_at'])
+            QRCodeJob.objects.filter(animal__in=updated).delete()
+        # bulk_update sends no signals
+        bump_catalog_version()
+        return len(pending), len(animals) - len(pending)
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from animals.export_jobs import process_export_job
+from animals.metrics import start_metrics_server
+
+
+class Command(BaseCommand):
+    help = 'Run queued background exports (runs as a long-lived worker unless --once is given)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue until empty and exit')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+    
+    def handle(self, *args, **options):
+        if settings.WORKER_METRICS_PORT and not options['once']:
+            start_metrics_server(settings.WORKER_METRICS_PORT)
+        total = 0
+        try:
+            while True:
+                if process_export_job():
+                    total += 1
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} export jobs processed.'))
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from animals.metrics import start_metrics_server
+from animals.qr_codes import process_qr_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued QR codes (runs as a long-lived worker unless --once is given)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue until empty and exit')
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per transaction')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+    
+    def handle(self, *args, **options):
+        if settings.WORKER_METRICS_PORT and not options['once']:
+            start_metrics_server(settings.WORKER_METRICS_PORT)
+        total = 0
+        try:
+            while True:
+                handled = process_qr_jobs(batch_size=options['batch_size'])
+                total += handled
+                if handled:
+                    self.stdout.write(f'Processed {handled} QR jobs')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} QR jobs processed.'))
@@ -0,0 +1,68 @@
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from animals.vaccination_schedule import DEFAULT_UPCOMING_DAYS, rebuild_schedule, vaccination_reminders
+from animals.vaccination_status import refresh_vaccination_status
+
+
+class Command(BaseCommand):
+    help = 'List overdue and upcoming vaccinations (meant to run daily, e.g. from cron)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=DEFAULT_UPCOMING_DAYS, help='How far ahead to look for upcoming doses')
+        parser.add_argument('--date', help='Report as of this date (YYYY-MM-DD, default today); stored statuses still use today')
+        parser.add_argument('--csv', metavar='PATH', help='Also write the list to a CSV file')
+        parser.add_argument('--include-adopted', action='store_true', help='Include adopted animals')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute the latest-vaccination table first')
+    
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be a date in YYYY-MM-DD format')
+        
+        if options['rebuild']:
+            count = rebuild_schedule()
+            self.stdout.write(f'Rebuilt the vaccination schedule for {count} animals.')
+        
+        # Doses become overdue with the passing of time, not only on edits.
+        # Always against the real date: --date only changes the report.
+        changed = refresh_vaccination_status()
+        if changed:
+            self.stdout.write(f'Vaccination status changed for {changed} animals.')
+        
+        reminders = vaccination_reminders(options['days'], today, include_adopted=options['include_adopted'])
+        sections = [
+            ('overdue', f'Overdue ({len(reminders["overdue"])})'),
+            ('upcoming', f'Due in the next {options["days"]} days ({len(reminders["upcoming"])})'),
+        ]
+        for key, title in sections:
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            for row in reminders[key]:
+                animal = row.animal
+                self.stdout.write(
+                    f'  {row.next_due_date:%d/%m/%Y}  {animal.name} ({animal.chip_id}), '
+                    f'cage {animal.cage_number}: {row.get_vaccine_display_name()}, '
+                    f'last dose {row.date_administered:%d/%m/%Y}'
+                )
+        
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8-sig') as fileobj:
+                writer = csv.writer(fileobj)
+                writer.writerow(['Κατάσταση', 'Επόμενη Δόση', 'Όνομα Ζώου', 'Chip ID', 'Κλουβί', 'Εμβόλιο', 'Τελευταία Δόση'])
+                for key, label in (('overdue', 'Εκπρόθεσμο'), ('upcoming', 'Επερχόμενο')):
+                    for row in reminders[key]:
+                        writer.writerow([
+                            label, row.next_due_date.strftime('%d/%m/%Y'), row.animal.name, row.animal.chip_id,
+                            row.animal.cage_number, row.get_vaccine_display_name(), row.date_administered.strftime('%d/%m/%Y'),
+                        ])
+            self.stdout.write(f'Written to {options["csv"]}')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {len(reminders["overdue"])} overdue, {len(reminders["upcoming"])} upcoming.'
+        ))
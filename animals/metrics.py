@@ -0,0 +1,139 @@
+"""
+Prometheus metrics, served as text on /metrics.
+
+With PROMETHEUS_MULTIPROC_DIR set (the Docker image sets it), every
+gunicorn worker writes its samples to its own memory-mapped file there, and
+/metrics adds them all up; otherwise only the serving process's samples are
+exposed. The directory is per container (a tmpfs emptied by the entrypoint):
+file names are PIDs, which repeat across containers. The QR and export
+workers serve their own metrics on WORKER_METRICS_PORT instead.
+/metrics answers only METRICS_ALLOWED_IPS, or a METRICS_TOKEN bearer token.
+Cache hit ratios are left to PromQL, e.g.
+sum(rate(shelter_chip_lookup_cache_total{result=~".*hit"}[5m])) / sum(rate(shelter_chip_lookup_cache_total[5m]))
+"""
+import hmac
+import ipaddress
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_http_methods
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client import multiprocess
+
+# Seconds; the default buckets stop at 10s, exports and QR batches run longer
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 100, 200)
+
+REQUEST_LATENCY = Histogram(
+    'shelter_http_request_duration_seconds', 'Request latency by URL name',
+    ['view', 'method'], buckets=DURATION_BUCKETS,
+)
+REQUESTS = Counter('shelter_http_requests', 'Requests by URL name and status code', ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'shelter_db_queries_per_request', 'SQL queries run by one request',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Counter('shelter_db_query_seconds', 'Time spent in SQL queries', ['view'])
+# livesum: summed over the running processes (gunicorn.conf.py drops exited workers)
+DB_POOL_CONNECTIONS = Gauge(
+    'shelter_db_pool_connections', 'Pooled database connections by state',
+    ['state'], multiprocess_mode='livesum',
+)
+DB_POOL_EVENTS = Counter('shelter_db_pool_events', 'Database pool events (created, reused, waits, ...)', ['event'])
+QR_RENDER_LATENCY = Histogram('shelter_qr_render_duration_seconds', 'Time to render one QR code PNG', buckets=DURATION_BUCKETS)
+QR_JOBS = Counter('shelter_qr_jobs', 'QR render queue jobs by outcome', ['result'])
+EXPORT_LATENCY = Histogram(
+    'shelter_export_duration_seconds', 'Time to write an export file',
+    ['kind', 'format', 'mode'], buckets=DURATION_BUCKETS,
+)
+EXPORT_ROWS = Counter('shelter_export_rows', 'Rows written by exports', ['kind', 'format'])
+CHIP_LOOKUP_CACHE = Counter('shelter_chip_lookup_cache', 'chip_id lookup cache lookups by result', ['result'])
+HEALTH_PROBE_LATENCY = Histogram('shelter_health_probe_duration_seconds', 'Readiness probe latency', ['probe'], buckets=DURATION_BUCKETS)
+PUBLIC_PAGE_CACHE = Counter('shelter_public_page_cache', 'Public adoption page cache lookups by result', ['result'])
+
+
+@contextmanager
+def observe_duration(histogram, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def request_view_name(request):
+    """URL name as the label; unresolved paths share one label so 404 scans can't add series"""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else '<unresolved>'
+
+
+class MetricsMiddleware:
+    """Latency and status per URL name, plus the query counts of QueryBudgetMiddleware"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        view = request_view_name(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            DB_QUERIES.labels(view).observe(stats.count)
+            DB_TIME.labels(view).inc(stats.duration)
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def start_metrics_server(port):
+    """Serve this process's metrics on their own port (background workers have no web server)"""
+    start_http_server(port, registry=get_registry())
+
+
+def metrics_allowed(request):
+    """Whether the client may scrape: an allowed address or the METRICS_TOKEN bearer token"""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+@require_http_methods(['GET'])
+def metrics_view(request):
+    """Prometheus text exposition (nginx does not proxy it: scrape web:8000 directly)"""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
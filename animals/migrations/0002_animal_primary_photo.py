@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_primary_photos(apps, schema_editor):
+    Animal = apps.get_model('animals', 'Animal')
+    AnimalPhoto = apps.get_model('animals', 'AnimalPhoto')
+    for animal_id in Animal.objects.values_list('pk', flat=True).iterator():
+        photo_id = (AnimalPhoto.objects.filter(animal_id=animal_id)
+                    .order_by('-is_primary', '-uploaded_at')
+                    .values_list('pk', flat=True).first())
+        if photo_id:
+            Animal.objects.filter(pk=animal_id).update(primary_photo_id=photo_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='primary_photo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='animals.animalphoto', verbose_name='Κύρια Φωτογραφία'),
+        ),
+        migrations.RunPython(backfill_primary_photos, migrations.RunPython.noop),
+    ]
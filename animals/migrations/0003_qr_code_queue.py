@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def initialize_qr_status(apps, schema_editor):
+    Animal = apps.get_model('animals', 'Animal')
+    QRCodeJob = apps.get_model('animals', 'QRCodeJob')
+    missing = Animal.objects.filter(models.Q(qr_code__isnull=True) | models.Q(qr_code=''))
+    Animal.objects.exclude(pk__in=missing.values('pk')).update(qr_status='ready')
+    QRCodeJob.objects.bulk_create([QRCodeJob(animal_id=pk) for pk in missing.values_list('pk', flat=True)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0002_animal_primary_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='qr_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Προσπάθειες QR'),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='qr_error',
+            field=models.TextField(blank=True, editable=False, verbose_name='Σφάλμα QR'),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'Σε αναμονή'), ('ready', 'Έτοιμο'), ('failed', 'Απέτυχε')], default='pending', editable=False, max_length=10, verbose_name='Κατάσταση QR'),
+        ),
+        migrations.CreateModel(
+            name='QRCodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Προσπάθειες')),
+                ('last_error', models.TextField(blank=True, verbose_name='Τελευταίο Σφάλμα')),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Εκτέλεση μετά από')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Δημιουργήθηκε στις')),
+                ('animal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='qr_job', to='animals.animal', verbose_name='Ζώο')),
+            ],
+            options={
+                'verbose_name': 'Εργασία QR',
+                'verbose_name_plural': 'Εργασίες QR',
+                'ordering': ['run_after'],
+            },
+        ),
+        migrations.RunPython(initialize_qr_status, migrations.RunPython.noop),
+    ]
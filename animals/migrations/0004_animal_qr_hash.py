@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0003_qr_code_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='qr_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Hash Δεδομένων QR'),
+        ),
+    ]
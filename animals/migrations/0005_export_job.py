@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('animals', '0004_animal_qr_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('animals', 'Ζώα'), ('vaccinations', 'Εμβολιασμοί')], max_length=20, verbose_name='Τύπος')),
+                ('status', models.CharField(choices=[('queued', 'Σε αναμονή'), ('running', 'Σε εξέλιξη'), ('done', 'Ολοκληρώθηκε'), ('failed', 'Απέτυχε')], db_index=True, default='queued', max_length=10, verbose_name='Κατάσταση')),
+                ('query', models.BinaryField()),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='Αρχείο')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Σύνολο Γραμμών')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='Γραμμές')),
+                ('error', models.TextField(blank=True, verbose_name='Σφάλμα')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Δημιουργήθηκε στις')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Ξεκίνησε στις')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Ολοκληρώθηκε στις')),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Ζητήθηκε από')),
+            ],
+            options={
+                'verbose_name': 'Εξαγωγή',
+                'verbose_name_plural': 'Εξαγωγές',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
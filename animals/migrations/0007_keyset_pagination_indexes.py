@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0006_export_job_format'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['-created_at', '-id'], name='animal_created_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animalphoto',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='photo_uploaded_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['-created_at', '-id'], name='medrecord_created_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:32
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from animals.search import build_search_document
+
+
+def backfill_search_documents(apps, schema_editor):
+    Animal = apps.get_model('animals', 'Animal')
+    batch = []
+    for animal in Animal.objects.only('pk', 'name', 'chip_id', 'capture_location', 'shelter').iterator(chunk_size=500):
+        animal.search_document = build_search_document(animal)
+        batch.append(animal)
+        if len(batch) >= 500:
+            Animal.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    Animal.objects.bulk_update(batch, ['search_document'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='animal',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Κείμενο Αναζήτησης'),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='animal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='animal_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
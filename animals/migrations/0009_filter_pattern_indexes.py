@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0008_animal_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('adoption_status__in', ['available', 'pending']), ('public_visibility', True)), fields=['-created_at'], name='animal_public_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['adoption_status', '-created_at'], name='animal_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['vaccine_name', '-date_administered'], name='vacc_name_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['-date_administered'], name='vacc_date_idx'),
+        ),
+    ]
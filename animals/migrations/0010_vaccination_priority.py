@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+def backfill_priority(apps, schema_editor):
+    Vaccination = apps.get_model('animals', 'Vaccination')
+    Vaccination.objects.filter(vaccine_name='rabies').update(priority=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0009_filter_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccination',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Προτεραιότητα'),
+        ),
+        migrations.RunPython(backfill_priority, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['priority', '-date_administered', '-id'], name='vacc_priority_date_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_latest_vaccinations(apps, schema_editor):
+    Vaccination = apps.get_model('animals', 'Vaccination')
+    LatestVaccination = apps.get_model('animals', 'LatestVaccination')
+    latest = {}
+    for vaccination in Vaccination.objects.order_by('date_administered', 'id').iterator(chunk_size=2000):
+        other = vaccination.other_vaccine_name.strip() if vaccination.vaccine_name == 'other' else ''
+        latest[(vaccination.animal_id, vaccination.vaccine_name, other)] = vaccination
+    LatestVaccination.objects.bulk_create([
+        LatestVaccination(
+            animal_id=animal_id, vaccine_name=vaccine_name, other_vaccine_name=other,
+            vaccination_id=vaccination.id,
+            date_administered=vaccination.date_administered,
+            next_due_date=vaccination.next_due_date,
+        )
+        for (animal_id, vaccine_name, other), vaccination in latest.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0010_vaccination_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestVaccination',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vaccine_name', models.CharField(choices=[('rabies', 'Λύσσα'), ('dhppi', 'DHPPi'), ('dappi', 'DAPPi'), ('parainfluenza', 'Parainfluenza'), ('parvovirus', 'Parvovirus'), ('leptospirosis', 'Λεπτοσπείρωση'), ('other', 'Άλλο')], max_length=50, verbose_name='Εμβόλιο')),
+                ('other_vaccine_name', models.CharField(blank=True, max_length=100, verbose_name='Όνομα Εμβολίου (αν επιλέξατε Άλλο)')),
+                ('date_administered', models.DateField(verbose_name='Τελευταία Δόση')),
+                ('next_due_date', models.DateField(blank=True, db_index=True, null=True, verbose_name='Επόμενη Δόση')),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_vaccinations', to='animals.animal', verbose_name='Ζώο')),
+                ('vaccination', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='animals.vaccination', verbose_name='Εμβολιασμός')),
+            ],
+            options={
+                'verbose_name': 'Προγραμματισμένος Εμβολιασμός',
+                'verbose_name_plural': 'Προγραμματισμένοι Εμβολιασμοί',
+                'ordering': ['next_due_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='latestvaccination',
+            constraint=models.UniqueConstraint(fields=('animal', 'vaccine_name', 'other_vaccine_name'), name='latest_vaccination_per_vaccine'),
+        ),
+        migrations.RunPython(backfill_latest_vaccinations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:40
+
+from django.db import migrations, models
+from django.db.models import Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+
+def backfill_vaccination_status(apps, schema_editor):
+    Animal = apps.get_model('animals', 'Animal')
+    LatestVaccination = apps.get_model('animals', 'LatestVaccination')
+    latest = LatestVaccination.objects.filter(animal=OuterRef('pk'))
+    Animal.objects.update(vaccination_status=Case(
+        When(Exists(latest.filter(next_due_date__lt=timezone.localdate())), then=Value('overdue')),
+        When(Exists(latest), then=Value('current')),
+        default=Value('unvaccinated'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0011_latest_vaccination'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='vaccination_status',
+            field=models.CharField(blank=True, choices=[('unvaccinated', 'Χωρίς εμβόλια'), ('current', 'Ενημερωμένο'), ('overdue', 'Εκπρόθεσμο')], db_index=True, editable=False, max_length=15, verbose_name='Κατάσταση Εμβολιασμού'),
+        ),
+        migrations.RunPython(backfill_vaccination_status, migrations.RunPython.noop),
+    ]
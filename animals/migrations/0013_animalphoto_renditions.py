@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0012_animal_vaccination_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animalphoto',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Παραλλαγές'),
+        ),
+    ]
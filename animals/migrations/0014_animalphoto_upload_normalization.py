@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0013_animalphoto_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animalphoto',
+            name='original',
+            field=models.FileField(blank=True, editable=False, upload_to='animal_photos/originals/', verbose_name='Πρωτότυπο'),
+        ),
+        migrations.AddField(
+            model_name='animalphoto',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Μέγεθος Αρχείου Μεταφόρτωσης'),
+        ),
+        migrations.AddField(
+            model_name='animalphoto',
+            name='stored_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Αποθηκευμένο Μέγεθος'),
+        ),
+    ]
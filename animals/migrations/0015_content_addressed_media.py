@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:45
+
+import animals.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0014_animalphoto_upload_normalization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='animal',
+            name='qr_code',
+            field=models.ImageField(blank=True, null=True, storage=animals.storage.get_content_addressed_storage, upload_to='qr_codes/', verbose_name='QR Code'),
+        ),
+        migrations.AlterField(
+            model_name='animalphoto',
+            name='image',
+            field=models.ImageField(storage=animals.storage.get_content_addressed_storage, upload_to='animal_photos/', verbose_name='Εικόνα'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_pickled_jobs(apps, schema_editor):
+    # Pending jobs only have the pickled query, which is dropped: ask for a re-run
+    ExportJob = apps.get_model('animals', 'ExportJob')
+    ExportJob.objects.filter(status__in=['queued', 'running']).update(
+        status='failed',
+        error='Η εξαγωγή ακυρώθηκε κατά την αναβάθμιση· παρακαλώ επαναλάβετέ την.',
+        finished_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0015_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Τελευταία Ενημέρωση'),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='object_ids',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(fail_pickled_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='exportjob',
+            name='query',
+        ),
+    ]
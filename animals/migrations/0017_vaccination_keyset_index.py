@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0016_export_job_object_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['-created_at', '-id'], name='vacc_created_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:24
+
+import os
+import uuid
+
+import animals.storage
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_originals(apps, schema_editor):
+    # Raw uploads used to sit under MEDIA_ROOT at their client file name,
+    # which nginx serves: move them to the private storage under random names
+    AnimalPhoto = apps.get_model('animals', 'AnimalPhoto')
+    private_storage = animals.storage.get_private_storage()
+    for photo in AnimalPhoto.objects.exclude(original='').iterator():
+        if not default_storage.exists(photo.original.name):
+            continue
+        ext = os.path.splitext(photo.original.name)[1].lower()
+        with default_storage.open(photo.original.name) as upload:
+            name = private_storage.save(f'animal_photos/originals/{uuid.uuid4().hex}{ext}', upload)
+        default_storage.delete(photo.original.name)
+        AnimalPhoto.objects.filter(pk=photo.pk).update(original=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0017_vaccination_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='animalphoto',
+            name='original',
+            field=models.FileField(blank=True, editable=False, storage=animals.storage.get_private_storage, upload_to='animal_photos/originals/', verbose_name='Πρωτότυπο'),
+        ),
+        migrations.RunPython(move_originals, migrations.RunPython.noop),
+    ]
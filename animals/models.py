@@ -1,17 +1,54 @@
 from django.db import models
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.core.files.base import ContentFile
 from django.conf import settings
-import json
+from django.contrib.postgres.indexes import GinIndex
+from .search import SEARCH_FIELDS, build_search_document, refresh_search_documents
+from .renditions import generate_renditions, get_rendition_url, renditions_current
+from .uploads import keep_original, normalize_upload
+from .storage import get_content_addressed_storage, get_private_storage
 import os
 
 def get_default_shelter_name():
     """Get default shelter name from environment"""
     return os.environ.get('ORGANIZATION_NAME', 'Καταφύγιο Εθελοντών Δήμου Καβάλας - Πολύστυλο')
 
+
+# Sent after Animal.objects.filter(...).update(...), which bypasses post_save
+animal_post_update = Signal()
+
+
+# Adoption statuses listed on the public pages
+PUBLIC_ADOPTION_STATUSES = ['available', 'pending']
+
+
+class AnimalQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Keep updated_at current like save() does; it versions the public page cache
+        kwargs.setdefault('updated_at', timezone.now())
+        # Pin the rows first: the filter may no longer match them after the update
+        pks = list(self.values_list('pk', flat=True))
+        if not pks:
+            return 0
+        updated = self.model._base_manager.filter(pk__in=pks)
+        rows = updated.update(**kwargs)
+        if set(kwargs) & set(SEARCH_FIELDS):
+            refresh_search_documents(updated)
+        animal_post_update.send(sender=self.model, queryset=updated, fields=set(kwargs))
+        return rows
+    
+    def with_primary_photo(self):
+        """Load the primary photo in the same query (no per-row photo lookups)"""
+        return self.select_related('primary_photo')
+    
+    def publicly_listed(self):
+        """Animals on the public adoption pages (matches animal_public_listing_idx)"""
+        return self.filter(public_visibility=True, adoption_status__in=PUBLIC_ADOPTION_STATUSES)
+
+
 class Animal(models.Model):
     SPECIES_CHOICES = [
         ('dog', 'Σκύλος'),
@@ -50,6 +87,18 @@ class Animal(models.Model):
         ('adopted', 'Υιοθετήθηκε'),
         ('not_for_adoption', 'Μη διαθέσιμο για υιοθεσία'),
     ]
+    
+    VACCINATION_STATUS_CHOICES = [
+        ('unvaccinated', 'Χωρίς εμβόλια'),
+        ('current', 'Ενημερωμένο'),
+        ('overdue', 'Εκπρόθεσμο'),
+    ]
+    
+    QR_STATUS_CHOICES = [
+        ('pending', 'Σε αναμονή'),
+        ('ready', 'Έτοιμο'),
+        ('failed', 'Απέτυχε'),
+    ]
 
     # Basic Information
     chip_id = models.CharField(
@@ -88,6 +137,8 @@ class Animal(models.Model):
     injured = models.BooleanField(default=False, verbose_name='Τραυματισμένο')
     behavior = models.CharField(max_length=25, choices=BEHAVIOR_CHOICES, verbose_name='Συμπεριφορά')
     sterilization_status = models.CharField(max_length=15, choices=STERILIZATION_CHOICES, verbose_name='Κατάσταση Στείρωσης')
+    # Denormalized from the vaccinations when VACCINATION_STATUS_DENORMALIZED is on (see vaccination_status.py)
+    vaccination_status = models.CharField(max_length=15, choices=VACCINATION_STATUS_CHOICES, blank=True, editable=False, db_index=True, verbose_name='Κατάσταση Εμβολιασμού')
     
     # Location and Housing
     cage_number = models.PositiveIntegerField(verbose_name='Αριθμός Κλουβιού', 
@@ -105,17 +156,50 @@ class Animal(models.Model):
     adoption_status = models.CharField(max_length=20, choices=ADOPTION_STATUS_CHOICES, default='available', verbose_name='Κατάσταση Υιοθεσίας')
     
     # QR Code
-    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True, verbose_name='QR Code')
+    qr_code = models.ImageField(upload_to='qr_codes/', storage=get_content_addressed_storage, blank=True, null=True, verbose_name='QR Code')
+    qr_hash = models.CharField(max_length=64, blank=True, editable=False, verbose_name='Hash Δεδομένων QR')
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default='pending', editable=False, verbose_name='Κατάσταση QR')
+    qr_attempts = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Προσπάθειες QR')
+    qr_error = models.TextField(blank=True, editable=False, verbose_name='Σφάλμα QR')
+    
+    # Primary photo (denormalized, kept in sync by AnimalPhoto signals)
+    primary_photo = models.ForeignKey(
+        'AnimalPhoto',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Κύρια Φωτογραφία'
+    )
+    
+    # Normalized search text (see animals/search.py), trigram indexed on PostgreSQL
+    search_document = models.TextField(blank=True, default='', editable=False, verbose_name='Κείμενο Αναζήτησης')
     
     # Metadata
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Δημιουργήθηκε από')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Δημιουργήθηκε στις')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Ενημερώθηκε')
     
+    objects = AnimalQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Ζώο"
         verbose_name_plural = "Ζώα"
+        indexes = [
+            # Keyset (cursor) pagination
+            models.Index(fields=['-created_at', '-id'], name='animal_created_keyset_idx'),
+            # Substring/fuzzy search (chip_id prefixes use the unique index's _like twin)
+            GinIndex(fields=['search_document'], opclasses=['gin_trgm_ops'], name='animal_search_trgm_idx'),
+            # Public adoption pages: only the listed animals, newest first
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(public_visibility=True, adoption_status__in=PUBLIC_ADOPTION_STATUSES),
+                name='animal_public_listing_idx',
+            ),
+            # Staff list / admin filtered by adoption status
+            models.Index(fields=['adoption_status', '-created_at'], name='animal_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.chip_id})"
@@ -148,48 +232,40 @@ class Animal(models.Model):
         }
     
     def generate_qr_code(self):
-        """Generate QR code containing animal information"""
-        try:
-            # Create QR data as JSON string
-            qr_data = json.dumps(self.get_qr_data(), ensure_ascii=False)
-            
-            # Generate QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            # Create image
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Save to model
-            filename = f'qr_{self.chip_id}.png'
-            self.qr_code.save(filename, File(buffer), save=False)
-            buffer.close()
-            
-        except Exception as e:
-            # Log error but don't fail the save
-            print(f"Error generating QR code for animal {self.chip_id}: {e}")
+        """Render the QR code PNG into the qr_code field (not saved)"""
+        from .qr_codes import render_qr_png, qr_data_hash
+        
+        qr_data = self.get_qr_data()
+        self.store_qr_png(render_qr_png(qr_data))
+        self.qr_hash = qr_data_hash(qr_data)
+    
+    def store_qr_png(self, png):
+        """Replace the stored QR image with the given PNG bytes (not saved)"""
+        # Content-addressed: the previous PNG is left for collect_media
+        self.qr_code.save(f'qr_{self.chip_id}.png', ContentFile(png), save=False)
     
     def save(self, *args, **kwargs):
-        # Save first to ensure we have an ID
         is_new = self.pk is None
+        needs_qr = is_new or not self.qr_code
+        if needs_qr and self.qr_status != 'pending':
+            self.qr_status = 'pending'
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'qr_status'}
+        
+        if is_new and not self.vaccination_status and settings.VACCINATION_STATUS_DENORMALIZED:
+            self.vaccination_status = 'unvaccinated'
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+            self.search_document = build_search_document(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document'}
         super().save(*args, **kwargs)
         
-        # Generate QR code if it doesn't exist or if this is a new animal
-        if is_new or not self.qr_code:
-            self.generate_qr_code()
-            if self.qr_code:  # Only update if QR generation succeeded
-                super().save(update_fields=['qr_code'])
+        # QR codes are rendered off-request by the process_qr_queue worker
+        if needs_qr:
+            from .qr_codes import enqueue_qr_code
+            enqueue_qr_code(self)
 
 
 class MedicalRecord(models.Model):
@@ -209,6 +285,9 @@ class MedicalRecord(models.Model):
         ordering = ['-date_recorded']
         verbose_name = "Ιατρικό Αρχείο"
         verbose_name_plural = "Ιατρικά Αρχεία"
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='medrecord_created_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.animal.name} - {self.get_record_type_display()}"
@@ -216,19 +295,81 @@ class MedicalRecord(models.Model):
 
 class AnimalPhoto(models.Model):
     animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='photos', verbose_name='Ζώο')
-    image = models.ImageField(upload_to='animal_photos/', verbose_name='Εικόνα')
+    image = models.ImageField(upload_to='animal_photos/', storage=get_content_addressed_storage, verbose_name='Εικόνα')
     is_primary = models.BooleanField(default=False, verbose_name='Κύρια Φωτογραφία')
     caption = models.CharField(max_length=100, blank=True, verbose_name='Λεζάντα')
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name='Ανέβηκε στις')
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Ανέβηκε από')
+    # Untouched upload, only kept with PHOTO_KEEP_ORIGINALS (see uploads.py); never served
+    original = models.FileField(upload_to='animal_photos/originals/', storage=get_private_storage, blank=True, editable=False, verbose_name='Πρωτότυπο')
+    original_size = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='Μέγεθος Αρχείου Μεταφόρτωσης')
+    stored_size = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='Αποθηκευμένο Μέγεθος')
+    # Generated resized copies, see renditions.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Παραλλαγές')
     
     class Meta:
         ordering = ["-is_primary", "-uploaded_at"]
         verbose_name = "Φωτογραφία Ζώου"
         verbose_name_plural = "Φωτογραφίες Ζώων"
+        indexes = [
+            models.Index(fields=['-uploaded_at', '-id'], name='photo_uploaded_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"Photo of {self.animal.name}"
+    
+    @property
+    def bytes_saved(self):
+        if self.original_size is None or self.stored_size is None:
+            return None
+        return self.original_size - self.stored_size
+    
+    def clean(self):
+        super().clean()
+        # Forms report an image that cannot be normalized instead of save() failing
+        if self.image and not self.image._committed:
+            normalize_upload(self)
+    
+    def save(self, *args, **kwargs):
+        # A new upload that has not been written to storage yet
+        if self.image and not self.image._committed:
+            normalize_upload(self)
+            keep_original(self)
+        super().save(*args, **kwargs)
+        if self.image and not renditions_current(self):
+            generate_renditions(self)
+    
+    def rendition_url(self, name, fmt='jpeg', generate=True):
+        """URL of a resized copy ('thumb', 'card' or 'full'; 'jpeg' or 'webp')"""
+        return get_rendition_url(self, name, fmt, generate)
+    
+    @classmethod
+    def refresh_primary_for(cls, animal_id):
+        """Point Animal.primary_photo to the primary photo, or the newest one (bumps updated_at)"""
+        photo_id = cls.objects.filter(animal_id=animal_id).values_list('pk', flat=True).first()
+        Animal.objects.filter(pk=animal_id).update(primary_photo_id=photo_id)
+
+
+class VaccinationQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # priority is derived from vaccine_name (see Vaccination.save)
+        if 'vaccine_name' in kwargs and isinstance(kwargs['vaccine_name'], str):
+            kwargs.setdefault('priority', Vaccination.priority_for(kwargs['vaccine_name']))
+        
+        # LatestVaccination is maintained by signals, which update() bypasses
+        from .vaccination_schedule import SCHEDULE_FIELDS, refresh_latest_vaccinations
+        from .vaccination_status import refresh_vaccination_status
+        animal_ids = set(self.values_list('animal_id', flat=True)) if set(kwargs) & SCHEDULE_FIELDS else None
+        rows = super().update(**kwargs)
+        if animal_ids is not None:
+            animal_ids.update(self.values_list('animal_id', flat=True))
+            refresh_latest_vaccinations(animal_ids)
+            refresh_vaccination_status(animal_ids)
+        return rows
+    
+    def by_priority(self):
+        """Rabies first, then newest; an index scan on vacc_priority_date_idx"""
+        return self.order_by(*self.model.PRIORITY_ORDERING)
 
 
 class Vaccination(models.Model):
@@ -243,6 +384,11 @@ class Vaccination(models.Model):
         ('other', 'Άλλο'),
     ]
     
+    # Listing priority per vaccine (lower first); everything else gets DEFAULT_PRIORITY
+    VACCINE_PRIORITIES = {'rabies': 0}
+    DEFAULT_PRIORITY = 1
+    PRIORITY_ORDERING = ['priority', '-date_administered', '-id']
+    
     animal = models.ForeignKey(
         Animal, 
         on_delete=models.CASCADE, 
@@ -291,11 +437,37 @@ class Vaccination(models.Model):
         auto_now_add=True, 
         verbose_name='Ημερομηνία Καταχώρησης'
     )
+    priority = models.PositiveSmallIntegerField(
+        default=DEFAULT_PRIORITY,
+        editable=False,
+        verbose_name='Προτεραιότητα'
+    )
+    
+    objects = VaccinationQuerySet.as_manager()
     
     class Meta:
         ordering = ['-date_administered']
         verbose_name = 'Εμβολιασμός'
         verbose_name_plural = 'Εμβολιασμοί'
+        indexes = [
+            # Admin filters on vaccine and date, newest first
+            models.Index(fields=['vaccine_name', '-date_administered'], name='vacc_name_date_idx'),
+            models.Index(fields=['-date_administered'], name='vacc_date_idx'),
+            # Rabies-first listing (by_priority)
+            models.Index(fields=['priority', '-date_administered', '-id'], name='vacc_priority_date_idx'),
+            # API cursor pagination (CreatedAtCursorPagination)
+            models.Index(fields=['-created_at', '-id'], name='vacc_created_keyset_idx'),
+        ]
+    
+    @classmethod
+    def priority_for(cls, vaccine_name):
+        return cls.VACCINE_PRIORITIES.get(vaccine_name, cls.DEFAULT_PRIORITY)
+    
+    def save(self, *args, **kwargs):
+        self.priority = self.priority_for(self.vaccine_name)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'priority'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         vaccine_display = self.other_vaccine_name if self.vaccine_name == 'other' else self.get_vaccine_name_display()
@@ -307,6 +479,121 @@ class Vaccination(models.Model):
             return self.other_vaccine_name
         return self.get_vaccine_name_display()
 
+class LatestVaccination(models.Model):
+    """
+    Most recent dose of each vaccine per animal, kept in sync with
+    Vaccination by signals (see vaccination_schedule.py). Due/overdue
+    lists are range scans on next_due_date.
+    """
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='latest_vaccinations', verbose_name='Ζώο')
+    vaccination = models.OneToOneField(Vaccination, on_delete=models.CASCADE, related_name='+', verbose_name='Εμβολιασμός')
+    vaccine_name = models.CharField(max_length=50, choices=Vaccination.VACCINE_CHOICES, verbose_name='Εμβόλιο')
+    other_vaccine_name = models.CharField(max_length=100, blank=True, verbose_name='Όνομα Εμβολίου (αν επιλέξατε Άλλο)')
+    date_administered = models.DateField(verbose_name='Τελευταία Δόση')
+    next_due_date = models.DateField(null=True, blank=True, db_index=True, verbose_name='Επόμενη Δόση')
+    
+    class Meta:
+        ordering = ['next_due_date']
+        verbose_name = 'Προγραμματισμένος Εμβολιασμός'
+        verbose_name_plural = 'Προγραμματισμένοι Εμβολιασμοί'
+        constraints = [
+            models.UniqueConstraint(fields=['animal', 'vaccine_name', 'other_vaccine_name'], name='latest_vaccination_per_vaccine'),
+        ]
+    
+    def __str__(self):
+        return f"{self.animal.name} - {self.get_vaccine_display_name()} ({self.next_due_date})"
+    
+    def get_vaccine_display_name(self):
+        if self.vaccine_name == 'other' and self.other_vaccine_name:
+            return self.other_vaccine_name
+        return self.get_vaccine_name_display()
+    
+    @property
+    def days_until_due(self):
+        """Negative when overdue, None without a due date"""
+        if self.next_due_date is None:
+            return None
+        return (self.next_due_date - timezone.localdate()).days
+
+
+class QRCodeJob(models.Model):
+    """Pending QR code render, consumed by the process_qr_queue command"""
+    animal = models.OneToOneField(Animal, on_delete=models.CASCADE, related_name='qr_job', verbose_name='Ζώο')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Προσπάθειες')
+    last_error = models.TextField(blank=True, verbose_name='Τελευταίο Σφάλμα')
+    run_after = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Εκτέλεση μετά από')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Δημιουργήθηκε στις')
+    
+    class Meta:
+        ordering = ['run_after']
+        verbose_name = 'Εργασία QR'
+        verbose_name_plural = 'Εργασίες QR'
+    
+    def __str__(self):
+        return f"QR job for animal {self.animal_id}"
+
+class ExportJob(models.Model):
+    """Background export, written under MEDIA_ROOT by the process_export_jobs command"""
+    KIND_CHOICES = [
+        ('animals', 'Ζώα'),
+        ('vaccinations', 'Εμβολιασμοί'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('queued', 'Σε αναμονή'),
+        ('running', 'Σε εξέλιξη'),
+        ('done', 'Ολοκληρώθηκε'),
+        ('failed', 'Απέτυχε'),
+    ]
+    
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Τύπος')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx', verbose_name='Μορφή')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', db_index=True, verbose_name='Κατάσταση')
+    object_ids = models.JSONField(default=list, editable=False)  # primary keys in export order
+    file = models.FileField(upload_to='exports/', blank=True, verbose_name='Αρχείο')
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name='Σύνολο Γραμμών')
+    row_count = models.PositiveIntegerField(default=0, verbose_name='Γραμμές')
+    error = models.TextField(blank=True, verbose_name='Σφάλμα')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Ζητήθηκε από')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Δημιουργήθηκε στις')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Ξεκίνησε στις')
+    # Touched while the worker makes progress; a running job that stops updating it is requeued
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='Τελευταία Ενημέρωση')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Ολοκληρώθηκε στις')
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Εξαγωγή'
+        verbose_name_plural = 'Εξαγωγές'
+        indexes = [
+            # claim_export_job(): oldest queued job first
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.pk}"
+    
+    @property
+    def progress(self):
+        """Completion percentage, None until the row total is known"""
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return None
+        return min(100, int(self.row_count * 100 / self.total_rows))
+    
+    @property
+    def duration(self):
+        if not self.started_at:
+            return None
+        return (self.finished_at or timezone.now()) - self.started_at
+
 # Force verbose_name_plural (workaround for caching issue)
 Animal._meta.verbose_name_plural = "Ζώα"
 MedicalRecord._meta.verbose_name_plural = "Ιατρικά Αρχεία"
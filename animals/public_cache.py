@@ -0,0 +1,118 @@
+"""
+Page cache and conditional GET support for the anonymous adoption pages.
+
+Every change to an animal (including its photos, vaccinations and medical
+records) bumps Animal.updated_at and the global catalog version, both via
+signals. Pages are cached under those versions, so invalidation is just a
+version change, and ETag/Last-Modified let clients and nginx revalidate
+with a 304 without rendering anything.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
+
+from .metrics import PUBLIC_PAGE_CACHE
+from .models import Animal
+
+CATALOG_VERSION_KEY = 'animals:public:catalog-version'
+
+
+def get_catalog_version():
+    """Timestamp of the last change to any animal (also the list Last-Modified)"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = time.time()
+        cache.add(CATALOG_VERSION_KEY, version, None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, time.time(), None)
+
+
+def get_animal_version(pk):
+    """
+    updated_at timestamp of a publicly visible animal, or None if it is not public.
+    Cached per catalog version, so a 304 normally costs no query.
+    """
+    key = f'animals:public:animal:{get_catalog_version()}:{pk}'
+    version = cache.get(key)
+    if version is None:
+        updated_at = Animal.objects.filter(pk=pk, public_visibility=True).values_list('updated_at', flat=True).first()
+        version = updated_at.timestamp() if updated_at else 0
+        cache.set(key, version, settings.PUBLIC_PAGE_CACHE_TIMEOUT)
+    return version or None
+
+
+class CachedPublicPageMixin:
+    """
+    Serve GET/HEAD from the page cache with ETag/Last-Modified validators.
+    Views implement get_page_version() returning (version key, last-modified
+    timestamp) or None for a 404, and list the query parameters they read in
+    cache_query_params; the rest (fbclid, utm_* and other tracking) share
+    the page's cache entry and ETag.
+
+    The handler is async, but Django 4.2's cache and ORM calls are sync
+    underneath (the file based cache's async API is a sync_to_async
+    wrapper), so the version lookup, the conditional check and the cache
+    read run together in one sync_to_async call; a miss takes a second one
+    to render and store the page. The sync middleware still adds their own
+    thread hops.
+    """
+
+    cache_query_params = ()
+
+    def get_page_version(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        response, etag, last_modified, key = await sync_to_async(self.cached_response)(request)
+        if response is None:
+            response = await sync_to_async(self.render_page)(key, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE)
+        return response
+
+    def cached_response(self, request):
+        """(304 or cached response, or None on a miss; ETag; Last-Modified; page cache key)"""
+        page_version = self.get_page_version()
+        if page_version is None:
+            raise Http404
+        version, last_modified = page_version
+
+        params = urlencode([(name, request.GET[name]) for name in self.cache_query_params if name in request.GET])
+        path_hash = hashlib.md5(f'{request.path}?{params}'.encode('utf-8')).hexdigest()
+        etag = quote_etag(hashlib.md5(f'{version}:{path_hash}'.encode('utf-8')).hexdigest())
+        last_modified = int(last_modified)
+        key = f'animals:public:page:{version}:{path_hash}'
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            PUBLIC_PAGE_CACHE.labels('not_modified').inc()
+            return response, etag, last_modified, key
+        content = cache.get(key)
+        if content is not None:
+            PUBLIC_PAGE_CACHE.labels('hit').inc()
+            return HttpResponse(content), etag, last_modified, key
+        PUBLIC_PAGE_CACHE.labels('miss').inc()
+        return None, etag, last_modified, key
+
+    def render_page(self, key, request, *args, **kwargs):
+        """Render the view's own (sync) get() and cache the page under key"""
+        response = super().get(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code == 200:
+            cache.set(key, response.content, settings.PUBLIC_PAGE_CACHE_TIMEOUT)
+        return response
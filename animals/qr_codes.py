@@ -0,0 +1,116 @@
+"""
+QR code rendering and the database-backed render queue.
+Animal.save() only enqueues a QRCodeJob; the process_qr_queue management
+command renders the PNGs outside the request/response cycle.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import QR_JOBS, QR_RENDER_LATENCY
+from .models import Animal, QRCodeJob
+
+logger = logging.getLogger(__name__)
+
+
+def render_qr_png(qr_data):
+    """Render QR data (a dict) to PNG bytes"""
+    with QR_RENDER_LATENCY.time():
+        return _render_qr_png(qr_data)
+
+
+def _render_qr_png(qr_data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(json.dumps(qr_data, ensure_ascii=False))
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def qr_data_hash(qr_data):
+    """Stable SHA-256 of the QR payload, used to skip unchanged renders"""
+    payload = json.dumps(qr_data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def enqueue_qr_code(animal):
+    """Queue a QR render for the animal (idempotent while a job is pending)"""
+    QRCodeJob.objects.update_or_create(
+        animal_id=animal.pk,
+        defaults={'run_after': timezone.now(), 'attempts': 0, 'last_error': ''},
+    )
+
+
+def enqueue_qr_codes(queryset):
+    """Queue QR renders for every animal in the queryset, returns the count"""
+    animal_ids = list(queryset.values_list('pk', flat=True))
+    with transaction.atomic():
+        QRCodeJob.objects.filter(animal_id__in=animal_ids).delete()
+        QRCodeJob.objects.bulk_create([QRCodeJob(animal_id=pk) for pk in animal_ids])
+        Animal.objects.filter(pk__in=animal_ids).update(qr_status='pending', qr_error='')
+    return len(animal_ids)
+
+
+def process_qr_jobs(batch_size=20):
+    """
+    Render up to batch_size due jobs. Jobs are claimed with SKIP LOCKED so
+    several workers can run side by side. Returns the number of jobs handled.
+    """
+    max_attempts = getattr(settings, 'QR_CODE_MAX_ATTEMPTS', 5)
+    handled = 0
+    
+    with transaction.atomic():
+        jobs = list(
+            QRCodeJob.objects.select_for_update(skip_locked=True)
+            .filter(run_after__lte=timezone.now())
+            .select_related('animal')[:batch_size]
+        )
+        for job in jobs:
+            handled += 1
+            animal = job.animal
+            try:
+                with transaction.atomic():
+                    animal.generate_qr_code()
+                    Animal.objects.filter(pk=animal.pk).update(
+                        qr_code=animal.qr_code.name,
+                        qr_hash=animal.qr_hash,
+                        qr_status='ready',
+                        qr_attempts=job.attempts + 1,
+                        qr_error='',
+                    )
+                    job.delete()
+                QR_JOBS.labels('ready').inc()
+            except Exception as e:
+                logger.exception("Error generating QR code for animal %s", animal.chip_id)
+                job.attempts += 1
+                job.last_error = str(e)
+                failed = job.attempts >= max_attempts
+                Animal.objects.filter(pk=animal.pk).update(
+                    qr_status='failed' if failed else 'pending',
+                    qr_attempts=job.attempts,
+                    qr_error=job.last_error,
+                )
+                QR_JOBS.labels('failed' if failed else 'retry').inc()
+                if failed:
+                    job.delete()
+                else:
+                    # Exponential backoff: 30s, 60s, 120s, ...
+                    job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+                    job.save(update_fields=['attempts', 'last_error', 'run_after'])
+    
+    return handled
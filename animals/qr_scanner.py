@@ -2,40 +2,100 @@
 QR Code Scanner functionality for animal shelter
 Provides web-based QR scanning and API endpoints for QR lookup
 """
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.http import JsonResponse, HttpResponseNotAllowed
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
+from functools import wraps
 import json
-from .models import Animal
+from .lookup_cache import chip_lookup_cache, NOT_FOUND
+from .query_budget import query_budget
 
 
+# Upper bound on payloads accepted by one batch scan request
+MAX_BATCH_SCAN_ITEMS = 200
+
+
+def async_view(methods, exempt_csrf=False):
+    """
+    require_http_methods (and csrf_exempt) for async views: Django 4.2's
+    decorators wrap them in sync functions, which would run them in a thread.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = exempt_csrf
+        return wrapper
+    return decorator
+
+
+async def is_authenticated(request):
+    """request.user.is_authenticated for async views (the user is loaded with the sync ORM)"""
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return False
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def extract_chip_id(qr_data):
+    """Chip ID from our QR JSON payload, or the raw scanned text"""
+    if not isinstance(qr_data, str):
+        return ''
+    try:
+        qr_info = json.loads(qr_data)
+        chip_id = qr_info.get('chip_id')
+    except (json.JSONDecodeError, AttributeError):
+        # If it's not JSON, assume it's just a chip_id string
+        chip_id = qr_data.strip()
+    return str(chip_id).strip() if chip_id else ''
+
+
+def absolute_urls(request, animal):
+    """Public payload with its URLs made absolute for this request"""
+    animal = dict(animal)
+    for field in ('photo_url', 'public_url'):
+        if animal.get(field):
+            animal[field] = request.build_absolute_uri(animal[field])
+    return animal
+
+
+@ensure_csrf_cookie
 def qr_scanner_page(request):
     """
     Web page with QR code scanner interface
-    Accessible to anyone (staff and public)
+    Accessible to anyone (staff and public); sets the CSRF cookie that
+    logged-in staff send (X-CSRFToken) with batch scans
     """
     return render(request, 'animals/qr_scanner.html')
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def scan_qr_code(request):
+@query_budget(5)
+@async_view(["POST"], exempt_csrf=True)
+async def scan_qr_code(request):
     """
     API endpoint to process scanned QR codes
-    Receives QR data and returns animal information
+    Receives QR data and returns animal information: the full record for
+    logged-in shelter users (who must send the CSRF token, as for batch
+    scans), the public one (as public_qr_lookup) for everyone else
     """
+    staff = await is_authenticated(request)
+    if staff:
+        # csrf_exempt only spares anonymous scans the token
+        rejected = CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+        if rejected is not None:
+            return rejected
+    
     try:
         data = json.loads(request.body)
         qr_data = data.get('qr_data', '')
         
         # Parse QR data (it should be JSON from our generated QR codes)
-        try:
-            qr_info = json.loads(qr_data)
-            chip_id = qr_info.get('chip_id')
-        except (json.JSONDecodeError, AttributeError):
-            # If it's not JSON, assume it's just a chip_id string
-            chip_id = qr_data.strip()
+        chip_id = extract_chip_id(qr_data)
         
         if not chip_id:
             return JsonResponse({
@@ -43,52 +103,94 @@ def scan_qr_code(request):
                 'error': 'No chip ID found in QR code'
             }, status=400)
         
-        # Look up the animal
-        try:
-            animal = Animal.objects.get(chip_id=chip_id)
-            
-            # Get primary photo or first photo
-            photo = animal.photos.filter(is_primary=True).first() or animal.photos.first()
-            photo_url = photo.image.url if photo else None
-            
-            response_data = {
-                'success': True,
-                'animal': {
-                    'id': animal.id,
-                    'chip_id': animal.chip_id,
-                    'name': animal.name,
-                    'species': animal.get_species_display(),
-                    'gender': animal.get_gender_display(),
-                    'age': animal.age_numeric if animal.age_numeric else animal.get_age_category_display(),
-                    'cage_number': animal.cage_number,
-                    'behavior': animal.get_behavior_display(),
-                    'vaccination_status': animal.get_vaccination_status_display(),
-                    'sterilization_status': animal.get_sterilization_status_display(),
-                    'adoption_status': animal.get_adoption_status_display(),
-                    'injured': animal.injured,
-                    'photo_url': photo_url,
-                    'public_url': f'/adopt/{animal.id}/' if animal.public_visibility else None,
-                    'entry_date': animal.entry_date.strftime('%Y-%m-%d'),
-                }
-            }
-            
-            return JsonResponse(response_data)
-            
-        except Animal.DoesNotExist:
+        # Look up the animal (cached per chip_id)
+        animal = await chip_lookup_cache.aget('staff' if staff else 'public', chip_id)
+        if animal == NOT_FOUND:
             return JsonResponse({
                 'success': False,
                 'error': f'Animal with chip ID {chip_id} not found'
             }, status=404)
+        if not staff:
+            animal = absolute_urls(request, animal)
+        
+        return JsonResponse({
+            'success': True,
+            'animal': animal
+        })
+    
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+# Constant whatever the batch size: session and user, one animals query
+# plus one vaccination summary query
+@query_budget(5)
+@require_http_methods(["POST"])
+def scan_qr_code_batch(request):
+    """
+    Batch variant of scan_qr_code for intake sessions.
+    Accepts {"items": [<QR payload or chip ID>, ...]} and resolves all of
+    them with one query; each result reports found/not found individually.
+    Shelter users only (session login, with the CSRF token), since it
+    returns full records for many chip IDs at once.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({
+            'success': False,
+            'error': 'Authentication required'
+        }, status=401)
+    
+    try:
+        data = json.loads(request.body)
+        items = data.get('items') if isinstance(data, dict) else None
+    except json.JSONDecodeError:
+        items = None
+    
+    if not isinstance(items, list) or not items:
+        return JsonResponse({
+            'success': False,
+            'error': 'items must be a non-empty list of QR payloads or chip IDs'
+        }, status=400)
+    if len(items) > MAX_BATCH_SCAN_ITEMS:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {MAX_BATCH_SCAN_ITEMS} items per request'
+        }, status=400)
     
+    chip_ids = [extract_chip_id(item) for item in items]
+    try:
+        animals = chip_lookup_cache.get_many('staff', list({chip_id for chip_id in chip_ids if chip_id}))
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
+    
+    results = []
+    for item, chip_id in zip(items, chip_ids):
+        if not chip_id:
+            results.append({'input': item, 'success': False, 'error': 'No chip ID found in QR code'})
+        elif animals[chip_id] == NOT_FOUND:
+            results.append({'input': item, 'chip_id': chip_id, 'success': False,
+                            'error': f'Animal with chip ID {chip_id} not found'})
+        else:
+            results.append({'input': item, 'chip_id': chip_id, 'success': True, 'animal': animals[chip_id]})
+    
+    found = sum(1 for result in results if result['success'])
+    return JsonResponse({
+        'success': True,
+        'found': found,
+        'not_found': len(results) - found,
+        'results': results,
+    })
 
 
-@require_http_methods(["GET"])
-def public_qr_lookup(request):
+@query_budget(3)
+@async_view(["GET"])
+async def public_qr_lookup(request):
     """
     Public API endpoint to look up animal by chip_id
     Used by QR scanner and external services
@@ -101,42 +203,14 @@ def public_qr_lookup(request):
             'error': 'chip_id parameter required'
         }, status=400)
     
-    try:
-        animal = Animal.objects.get(chip_id=chip_id)
-        
-        # Only return public info for non-public animals
-        if not animal.public_visibility:
-            return JsonResponse({
-                'success': True,
-                'animal': {
-                    'chip_id': animal.chip_id,
-                    'name': animal.name,
-                    'species': animal.get_species_display(),
-                    'status': 'Registered in shelter system',
-                    'message': 'Contact shelter for more information'
-                }
-            })
-        
-        # Return full public info for publicly visible animals
-        photo = animal.photos.filter(is_primary=True).first() or animal.photos.first()
-        photo_url = request.build_absolute_uri(photo.image.url) if photo else None
-        
-        return JsonResponse({
-            'success': True,
-            'animal': {
-                'chip_id': animal.chip_id,
-                'name': animal.name,
-                'species': animal.get_species_display(),
-                'gender': animal.get_gender_display(),
-                'age': animal.age_numeric if animal.age_numeric else animal.get_age_category_display(),
-                'adoption_status': animal.get_adoption_status_display(),
-                'photo_url': photo_url,
-                'public_url': request.build_absolute_uri(f'/adopt/{animal.id}/'),
-            }
-        })
-        
-    except Animal.DoesNotExist:
+    animal = await chip_lookup_cache.aget('public', chip_id)
+    if animal == NOT_FOUND:
         return JsonResponse({
             'success': False,
             'error': 'Animal not found'
-        }, status=404)
\ No newline at end of file
+        }, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'animal': absolute_urls(request, animal)
+    })
@@ -0,0 +1,167 @@
+"""
+SQL query counting and N+1 detection.
+
+track_queries() counts the queries, total database time and repeated query
+shapes (fingerprints, with literals replaced by ?) run inside a block.
+QueryBudgetMiddleware does the same for every request and checks it against
+the view's budget: a `query_budget` attribute on the view class/function,
+an entry in SQL_QUERY_BUDGETS keyed by URL name (admin and API views), or
+SQL_QUERY_BUDGET_DEFAULT. The same query shape running more than
+SQL_DUPLICATE_QUERY_LIMIT times is reported as a likely N+1.
+Violations are logged; with SQL_QUERY_BUDGET_STRICT they raise
+QueryBudgetExceeded instead, which makes regressions fail the tests
+(animals/tests/test_query_budgets.py runs the budgeted views that way).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Query shape: literals and IN (...) lists collapsed, so per-row queries compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+class QueryStats:
+    """Queries seen by track_queries(); `duration` is in seconds"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=None):
+        """{fingerprint: count} of the query shapes repeated more than `limit` times"""
+        limit = settings.SQL_DUPLICATE_QUERY_LIMIT if limit is None else limit
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > limit}
+
+    def violations(self, budget=None, duplicate_limit=None):
+        """Human readable budget/N+1 violations (empty if none)"""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f'{self.count} queries (budget {budget})')
+        for sql, count in self.duplicates(duplicate_limit).items():
+            problems.append(f'{count}x {sql[:300]}')
+        return problems
+
+    def check(self, budget=None, duplicate_limit=None, strict=None):
+        """Log the violations, or raise QueryBudgetExceeded in strict mode"""
+        problems = self.violations(budget, duplicate_limit)
+        if not problems:
+            return
+        message = f'{self.label or "queries"}: ' + '; '.join(problems)
+        if settings.SQL_QUERY_BUDGET_STRICT if strict is None else strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning('Query budget exceeded in %s', message)
+
+
+@contextmanager
+def track_queries(label=None, budget=None, duplicate_limit=None, strict=None, check=True):
+    """
+    Count the queries of a block on all database connections:
+
+        with track_queries('adoption list', budget=5, strict=True) as stats:
+            client.get('/adopt/')
+        stats.count, stats.duration, stats.duplicates()
+    """
+    stats = QueryStats(label)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+    if check:
+        stats.check(budget, duplicate_limit, strict)
+
+
+def query_budget(queries):
+    """Set the query budget of a function based view (class based views set `query_budget`)"""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def get_view_budget(request, view_func):
+    view_name = request.resolver_match.view_name if request.resolver_match else None
+    if view_name in settings.SQL_QUERY_BUDGETS:
+        return settings.SQL_QUERY_BUDGETS[view_name]
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return getattr(view, 'query_budget', settings.SQL_QUERY_BUDGET_DEFAULT)
+
+
+class QueryBudgetMiddleware:
+    """Track the queries of every view and check them against its budget"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_INSTRUMENTATION:
+            return self.get_response(request)
+        request.query_budget = settings.SQL_QUERY_BUDGET_DEFAULT
+        with track_queries(check=False) as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        if not settings.SQL_INSTRUMENTATION:
+            return await self.get_response(request)
+        request.query_budget = settings.SQL_QUERY_BUDGET_DEFAULT
+        # Connections are per thread and the async ORM runs its queries in
+        # the request's thread-sensitive executor, so wrap them there. This
+        # costs two thread hops per request on top of the view's own.
+        tracker = track_queries(check=False)
+        stats = await sync_to_async(tracker.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracker.__exit__)(None, None, None)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        request.query_stats = stats
+        view_name = request.resolver_match.view_name if request.resolver_match else request.path
+        stats.label = f'{request.method} {view_name}'
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+        stats.check(request.query_budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.SQL_INSTRUMENTATION:
+            request.query_budget = get_view_budget(request, view_func)
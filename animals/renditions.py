@@ -0,0 +1,142 @@
+"""
+Resized renditions of AnimalPhoto images.
+
+Each photo gets every RENDITIONS size in every RENDITION_FORMATS format,
+written next to the media files under renditions/. They are generated when
+a photo is saved, or lazily the first time one is asked for (photos from
+before the backfill). AnimalPhoto.renditions records the generated files,
+so pages do not have to check the disk, or the error if the image could
+not be read, so it is not decoded again on every page view (the
+generate_photo_renditions command --force retries). The originals are
+never served to browsers.
+"""
+import io
+import logging
+import os
+from collections import namedtuple
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+
+# AnimalPhoto.renditions keys that are not rendition files
+SOURCE_KEY = 'source'
+ERROR_KEY = 'error'
+
+RenditionSpec = namedtuple('RenditionSpec', ['width', 'height', 'crop'])
+
+# Each one is resized from the (draft-decoded) source image
+RENDITIONS = {
+    'full': RenditionSpec(1600, 1600, False),  # detail page main photo
+    'card': RenditionSpec(640, 500, True),     # adoption grid (250px high at 2x)
+    'thumb': RenditionSpec(200, 200, True),    # admin lists, detail thumbnails
+}
+
+# format -> (Pillow format, extension, save options)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_key(name, fmt):
+    return f'{name}.{fmt}'
+
+
+def rendition_path(photo, name, fmt):
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    return f'{RENDITIONS_DIR}/{photo.pk}/{stem}_{name}.{RENDITION_FORMATS[fmt][1]}'
+
+
+def resize(img, spec):
+    if spec.crop:
+        return ImageOps.fit(img, (spec.width, spec.height), Image.LANCZOS)
+    img = img.copy()
+    img.thumbnail((spec.width, spec.height), Image.LANCZOS)
+    return img
+
+
+def render_renditions(fileobj):
+    """{(name, fmt): bytes} for every rendition of an image file"""
+    largest = max(max(spec.width, spec.height) for spec in RENDITIONS.values())
+    with Image.open(fileobj) as img:
+        # JPEG: let the decoder downscale (by up to 8x) instead of decoding every pixel
+        img.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        
+        rendered = {}
+        for name, spec in RENDITIONS.items():
+            resized = resize(img, spec)
+            for fmt, (pil_format, _, options) in RENDITION_FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                rendered[(name, fmt)] = buffer.getvalue()
+    return rendered
+
+
+def rendition_paths(renditions):
+    """Storage names of the rendition files recorded in AnimalPhoto.renditions"""
+    return [path for key, path in renditions.items() if key not in (SOURCE_KEY, ERROR_KEY) and path]
+
+
+def delete_renditions(renditions):
+    for path in rendition_paths(renditions):
+        default_storage.delete(path)
+
+
+def generate_renditions(photo):
+    """
+    Render and store all renditions of a photo and record them on the row.
+    Returns False if the image can't be read; the error is recorded instead,
+    and the original is served until the renditions are regenerated.
+    """
+    old = photo.renditions or {}
+    try:
+        with photo.image.open('rb') as fileobj:
+            rendered = render_renditions(fileobj)
+    except Exception as e:
+        logger.exception('Could not render renditions for photo %s', photo.pk)
+        delete_renditions(old)
+        save_renditions(photo, {SOURCE_KEY: photo.image.name, ERROR_KEY: str(e) or e.__class__.__name__})
+        return False
+    
+    renditions = {SOURCE_KEY: photo.image.name}
+    for (name, fmt), data in rendered.items():
+        path = rendition_path(photo, name, fmt)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        renditions[rendition_key(name, fmt)] = default_storage.save(path, ContentFile(data))
+    delete_renditions({key: path for key, path in old.items() if path not in renditions.values()})
+    save_renditions(photo, renditions)
+    return True
+
+
+def save_renditions(photo, renditions):
+    from .models import AnimalPhoto
+    
+    photo.renditions = renditions
+    # Plain update: no save() side effects (signals, updated_at bumps)
+    AnimalPhoto.objects.filter(pk=photo.pk).update(renditions=renditions)
+
+
+def renditions_current(photo):
+    """Whether the renditions, or the failure to render them, are for the current image"""
+    return bool(photo.renditions) and photo.renditions.get(SOURCE_KEY) == photo.image.name
+
+
+def get_rendition_url(photo, name, fmt='jpeg', generate=True):
+    """
+    URL of a rendition, generating the renditions first if needed.
+    With generate=False only already stored renditions are used (the
+    original's URL otherwise), so nothing is decoded.
+    """
+    if not photo.image:
+        return None
+    if not renditions_current(photo) and not (generate and generate_renditions(photo)):
+        return photo.image.url
+    path = photo.renditions.get(rendition_key(name, fmt))
+    return default_storage.url(path) if path else photo.image.url
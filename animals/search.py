@@ -0,0 +1,77 @@
+"""
+Accent-insensitive animal search.
+
+Animal.search_document holds a normalized copy (casefolded, accents
+stripped) of SEARCH_FIELDS and is kept up to date by Animal.save(). On
+PostgreSQL it carries a trigram GIN index, so substring and typo-tolerant
+matches are index scans, and results are ranked by trigram word similarity.
+chip_id prefixes use the varchar_pattern_ops "_like" index Django creates
+next to the unique chip_id index.
+
+The text is normalized in Python rather than with unaccent(), which is not
+IMMUTABLE and therefore cannot be used in an index expression.
+"""
+import unicodedata
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+
+SEARCH_FIELDS = ('name', 'chip_id', 'capture_location', 'shelter')
+
+# Shorter terms produce too few trigrams for a useful fuzzy match
+MIN_FUZZY_LENGTH = 3
+
+
+def normalize_search_text(value):
+    """'Ρεξ Άλφα' -> 'ρεξ αλφα' (casefold also turns final ς into σ)"""
+    value = unicodedata.normalize('NFKD', str(value)).casefold()
+    return ' '.join(''.join(char for char in value if not unicodedata.combining(char)).split())
+
+
+def build_search_document(animal):
+    return normalize_search_text(' '.join(str(getattr(animal, field) or '') for field in SEARCH_FIELDS))
+
+
+def ranks_results(queryset):
+    """Whether search_animals() annotates search_rank on this database"""
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_animals(queryset, query):
+    """
+    Filter animals matching every word of query, or whose chip_id starts
+    with it. On PostgreSQL fuzzy matches are included and the result is
+    annotated with search_rank and ordered by it (exact chip_id first).
+    """
+    query = query.strip()
+    term = normalize_search_text(query)
+    if not term:
+        return queryset
+
+    words = Q()
+    for word in term.split():
+        words &= Q(search_document__contains=word)
+    matches = Q(chip_id__startswith=query) | words
+
+    if not ranks_results(queryset):
+        return queryset.filter(matches)
+
+    if len(term) >= MIN_FUZZY_LENGTH:
+        matches |= Q(search_document__trigram_word_similar=term)
+    return queryset.filter(matches).annotate(
+        search_rank=Case(
+            When(chip_id=query, then=Value(3.0)),
+            When(chip_id__startswith=query, then=Value(2.0)),
+            default=TrigramWordSimilarity(term, 'search_document'),
+            output_field=FloatField(),
+        )
+    ).order_by('-search_rank', '-created_at', '-id')
+
+
+def refresh_search_documents(queryset):
+    """Rebuild search_document for a queryset (after bulk updates)"""
+    animals = list(queryset.only('pk', *SEARCH_FIELDS))
+    for animal in animals:
+        animal.search_document = build_search_document(animal)
+    queryset.model._base_manager.bulk_update(animals, ['search_document'], batch_size=500)
@@ -0,0 +1,64 @@
+"""
+Signal receivers keeping denormalized data and caches in sync with the models.
+Connected in AnimalsConfig.ready().
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Animal, AnimalPhoto, LatestVaccination, MedicalRecord, Vaccination, animal_post_update
+from .lookup_cache import chip_lookup_cache
+from .public_cache import bump_catalog_version
+from .renditions import delete_renditions
+from .stats import STAT_FIELDS, invalidate_animal_stats
+from .vaccination_schedule import refresh_latest_vaccinations
+from .vaccination_status import refresh_vaccination_status
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def animal_changed(sender, instance, **kwargs):
+    invalidate_animal_stats()
+    bump_catalog_version()
+    chip_lookup_cache.invalidate([instance.chip_id])
+
+
+@receiver(animal_post_update, sender=Animal)
+def animals_bulk_updated(sender, queryset, fields, **kwargs):
+    if fields & STAT_FIELDS:
+        invalidate_animal_stats()
+    bump_catalog_version()
+    chip_lookup_cache.invalidate(queryset.values_list('chip_id', flat=True))
+
+
+@receiver(post_save, sender=Vaccination)
+@receiver(post_delete, sender=Vaccination)
+def vaccination_changed(sender, instance, **kwargs):
+    # Runs before animal_record_changed, which invalidates the caches.
+    # Includes the animal the dose was previously recorded on, if it was moved.
+    animal_ids = {instance.animal_id}
+    animal_ids.update(LatestVaccination.objects.filter(vaccination_id=instance.pk).values_list('animal_id', flat=True))
+    refresh_latest_vaccinations(animal_ids)
+    refresh_vaccination_status(animal_ids)
+
+
+@receiver(post_save, sender=Vaccination)
+@receiver(post_delete, sender=Vaccination)
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=MedicalRecord)
+def animal_record_changed(sender, instance, **kwargs):
+    # Shown on the public detail page, so the animal's version must change
+    Animal.objects.filter(pk=instance.animal_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=AnimalPhoto)
+@receiver(post_delete, sender=AnimalPhoto)
+def animal_photo_changed(sender, instance, **kwargs):
+    AnimalPhoto.refresh_primary_for(instance.animal_id)
+
+
+@receiver(post_delete, sender=AnimalPhoto)
+def animal_photo_deleted(sender, instance, **kwargs):
+    delete_renditions(instance.renditions)
+    if instance.original:
+        instance.original.delete(save=False)
@@ -0,0 +1,65 @@
+"""
+Shelter statistics for the admin changelist.
+All breakdowns are computed in a single conditional-aggregation query and
+optionally cached until an Animal is saved, deleted or bulk-updated.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Animal
+
+STATS_CACHE_KEY = 'animals:stats'
+
+# stat name -> filter
+STAT_FILTERS = {
+    'total': Q(),
+    'dogs': Q(species='dog'),
+    'cats': Q(species='cat'),
+    'other_species': Q(species='other'),
+    'males': Q(gender='male'),
+    'females': Q(gender='female'),
+    'sterilized': Q(sterilization_status='yes'),
+    'not_sterilized': Q(sterilization_status='no'),
+    'sterilization_scheduled': Q(sterilization_status='scheduled'),
+    'injured': Q(injured=True),
+    'healthy': Q(injured=False),
+    'available': Q(adoption_status='available'),
+    'pending': Q(adoption_status='pending'),
+    'adopted': Q(adoption_status='adopted'),
+    'not_for_adoption': Q(adoption_status='not_for_adoption'),
+    'public': Q(public_visibility=True),
+    'private': Q(public_visibility=False),
+}
+
+# Fields whose changes affect the numbers above
+STAT_FIELDS = {'species', 'gender', 'sterilization_status', 'injured', 'adoption_status', 'public_visibility'}
+
+
+def compute_animal_stats(queryset=None):
+    """Compute all statistics with one SELECT COUNT(...) FILTER (...) query"""
+    if queryset is None:
+        queryset = Animal.objects.all()
+    # Aliases are prefixed so they cannot clash with field names (e.g. injured)
+    result = queryset.order_by().aggregate(**{
+        f'stat_{name}': Count('pk', filter=condition)
+        for name, condition in STAT_FILTERS.items()
+    })
+    return {name: result[f'stat_{name}'] for name in STAT_FILTERS}
+
+
+def get_animal_stats(use_cache=True):
+    """Return the statistics snapshot, from cache when available"""
+    timeout = getattr(settings, 'ANIMAL_STATS_CACHE_TIMEOUT', 300)
+    if not use_cache or not timeout:
+        return compute_animal_stats()
+    
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_animal_stats()
+        cache.set(STATS_CACHE_KEY, stats, timeout)
+    return stats
+
+
+def invalidate_animal_stats():
+    cache.delete(STATS_CACHE_KEY)
@@ -0,0 +1,108 @@
+"""
+Content-addressed media storage.
+
+Files are stored under their SHA-256 digest (qr_codes/3f/3fa9...c1.png) instead
+of the uploaded name, so identical bytes are stored once and a URL always
+serves the same content; nginx caches these paths as immutable. Nothing
+deletes a content-addressed file when a row changes or goes away (another
+row may share it): unreferenced files are removed by the collect_media
+command instead. Saving a duplicate refreshes the existing file's mtime, so
+that command treats a file an upload has just reused as new.
+"""
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+# Hex digits of the digest used in file names (128 bits)
+DIGEST_LENGTH = 32
+
+
+def content_digest(content):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:DIGEST_LENGTH]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after their content and never stores a duplicate"""
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name)
+        digest = content_digest(content)
+        ext = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{ext}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.reuse(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def reuse(self, name):
+        """Whether the file already exists; if so its mtime is refreshed (see collect_media)"""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get_available_name(self, name, max_length=None):
+        # The name is the content: an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        if self.reuse(name):
+            return name
+        # Write under a unique name and rename, so a concurrent save of the
+        # same bytes can never expose a partially written file
+        temp_name = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
+
+
+@deconstructible
+class PrivateStorage(FileSystemStorage):
+    """Files under PRIVATE_MEDIA_ROOT, outside the media root nginx serves; they have no URL"""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+    def url(self, name):
+        raise ValueError('Private files have no URL')
+
+
+private_storage = PrivateStorage()
+
+
+def get_private_storage():
+    return private_storage
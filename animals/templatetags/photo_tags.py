@@ -0,0 +1,30 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def rendition_url(photo, name='card', fmt='jpeg'):
+    """{% rendition_url photo 'thumb' 'webp' %}"""
+    return photo.rendition_url(name, fmt) if photo else ''
+
+
+@register.simple_tag
+def picture(photo, name='card', **attrs):
+    """
+    <picture> with a WebP source and a JPEG fallback for one rendition;
+    extra keyword arguments become <img> attributes:
+    {% picture photo 'card' alt=animal.name class='animal-image' %}
+    """
+    if not photo:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}"{}></picture>',
+        photo.rendition_url(name, 'webp'),
+        photo.rendition_url(name, 'jpeg'),
+        flatatt(attrs),
+    )
@@ -0,0 +1,117 @@
+"""
+Query budgets of the hot views, enforced.
+
+Every view runs under track_queries(strict=True) with the budget it
+declares, and with SQL_QUERY_BUDGET_STRICT so QueryBudgetMiddleware raises
+too: a budget regression or an N+1 (one query shape repeated for more than
+SQL_DUPLICATE_QUERY_LIMIT rows) fails the test instead of logging a warning.
+"""
+import io
+import shutil
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from animals.api.views import AnimalViewSet
+from animals.lookup_cache import chip_lookup_cache
+from animals.models import Animal, AnimalPhoto, MedicalRecord, Vaccination
+from animals.qr_scanner import public_qr_lookup
+from animals.query_budget import QueryBudgetExceeded, track_queries
+from animals.views import AnimalListView, PublicAdoptionView, PublicAnimalDetailView
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='shelter-test-media-')
+
+
+def jpeg_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'tan').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, SQL_INSTRUMENTATION=True, SQL_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    # More rows than SQL_DUPLICATE_QUERY_LIMIT, so per-row queries show up as N+1
+    ANIMALS = settings.SQL_DUPLICATE_QUERY_LIMIT + 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+        cls.animals = []
+        for i in range(cls.ANIMALS):
+            animal = Animal.objects.create(
+                name=f'Ζώο {i}', chip_id=f'{900000000000000 + i}', species='dog' if i % 2 else 'cat',
+                gender='male', age_numeric=2, behavior='ΗΡΕΜΟ', sterilization_status='yes', cage_number=i,
+                capture_location='Καβάλα', capture_date=date(2024, 1, 1), public_visibility=True,
+                created_by=cls.staff,
+            )
+            photo = AnimalPhoto(animal=animal, is_primary=True)
+            photo.image.save(f'photo_{i}.jpg', ContentFile(jpeg_bytes()), save=False)
+            photo.save()
+            Vaccination.objects.create(animal=animal, vaccine_name='rabies', date_administered=date(2024, 2, 1), created_by=cls.staff)
+            MedicalRecord.objects.create(animal=animal, record_type='diagnosis', description='Έλεγχος',
+                                         date_recorded=date(2024, 2, 1), created_by=cls.staff)
+            cls.animals.append(animal)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Measure the uncached paths
+        cache.clear()
+        chip_lookup_cache.clear()
+
+    def assertWithinBudget(self, url, budget, login=False):
+        if login:
+            self.client.force_login(self.staff)
+        with track_queries(url, budget=budget, strict=True):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_detects_n_plus_one(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with track_queries('per-row creator', strict=True):
+                [animal.created_by for animal in Animal.objects.all()]
+
+    def test_public_adoption_list(self):
+        self.assertWithinBudget(reverse('animals:public_adoption'), PublicAdoptionView.query_budget)
+
+    def test_public_animal_detail(self):
+        url = reverse('animals:public_animal_detail', args=[self.animals[0].pk])
+        self.assertWithinBudget(url, PublicAnimalDetailView.query_budget)
+
+    def test_staff_animal_list(self):
+        url = reverse('animals:animal_list')
+        self.assertWithinBudget(url, AnimalListView.query_budget, login=True)
+        self.assertWithinBudget(f'{url}?mode=more', AnimalListView.query_budget, login=True)
+
+    def test_animal_api_list(self):
+        url = reverse('animal-list')
+        self.assertWithinBudget(url, AnimalViewSet.query_budget, login=True)
+        self.assertWithinBudget(f'{url}?expand=photos,medical_records', AnimalViewSet.query_budget, login=True)
+
+    def test_qr_lookup(self):
+        url = f"{reverse('animals:qr_lookup')}?chip_id={self.animals[0].chip_id}"
+        self.assertWithinBudget(url, public_qr_lookup.query_budget)
+
+    def test_admin_changelists(self):
+        for url_name, budget in settings.SQL_QUERY_BUDGETS.items():
+            with self.subTest(url_name):
+                self.assertWithinBudget(reverse(url_name), budget, login=True)
+
+    def test_admin_animal_search(self):
+        url = reverse('admin:animals_animal_changelist')
+        budget = settings.SQL_QUERY_BUDGETS['admin:animals_animal_changelist']
+        for query in ('q=ζωο', f'q={self.animals[0].chip_id[:13]}', 'q=ζωο&o=2'):
+            with self.subTest(query):
+                response = self.assertWithinBudget(f'{url}?{query}', budget, login=True)
+                self.assertContains(response, self.animals[0].chip_id)
@@ -0,0 +1,122 @@
+"""
+Normalization of uploaded animal photos.
+
+Phone photos arrive as 8-12MB JPEGs with the orientation in EXIF and often
+GPS coordinates of where the animal was found. Before an upload is stored
+it is decoded at reduced size (JPEG draft mode, then reduce()), rotated
+according to EXIF, capped to PHOTO_UPLOAD_MAX_DIMENSION and re-encoded as
+a JPEG without any metadata. An upload that cannot be normalized is
+rejected rather than stored with its metadata. The untouched upload is kept
+in AnimalPhoto.original only when PHOTO_KEEP_ORIGINALS is set, under a
+random name in the private storage (never under MEDIA_ROOT, which is public).
+"""
+import io
+import logging
+import os
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+NormalizedImage = namedtuple('NormalizedImage', ['data', 'width', 'height'])
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF orientation -> transpose that displays the image upright
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def flatten(img):
+    """RGB copy of an image, with any transparency composited on white"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def normalize_image(fileobj, max_dimension=None, quality=None):
+    """
+    Decode, orient, downscale and re-encode an image file as a metadata-free JPEG.
+    Raises the Pillow error if the file is not a readable image.
+    """
+    max_dimension = max_dimension or settings.PHOTO_UPLOAD_MAX_DIMENSION
+    quality = quality or settings.PHOTO_UPLOAD_QUALITY
+
+    with Image.open(fileobj) as img:
+        transpose = EXIF_TRANSPOSE.get(img.getexif().get(EXIF_ORIENTATION_TAG, 1))
+        icc_profile = img.info.get('icc_profile')
+        # JPEG: decode at 1/2, 1/4 or 1/8 scale straight away (never below the target size)
+        img.draft('RGB', (max_dimension, max_dimension))
+        img = flatten(img)
+        # Other formats: cheap integer reduce() before the resampling filter
+        factor = max(img.size) // max_dimension
+        if factor >= 2:
+            img = img.reduce(factor)
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        # Rotating the downscaled image is the same as rotating first, and cheaper
+        if transpose is not None:
+            img = img.transpose(transpose)
+
+        buffer = io.BytesIO()
+        options = {'quality': quality, 'optimize': True, 'progressive': True}
+        if icc_profile:
+            # Colour profile only: EXIF, XMP and comments are dropped
+            options['icc_profile'] = icc_profile
+        img.save(buffer, 'JPEG', **options)
+    return NormalizedImage(buffer.getvalue(), img.width, img.height)
+
+
+def normalize_upload(photo):
+    """
+    Replace a new (not yet stored) upload on an AnimalPhoto with its normalized
+    JPEG and record the sizes. Raises ValidationError if the file cannot be
+    normalized. Calling it again for the same upload does nothing.
+    """
+    upload = photo.image.file
+    if getattr(upload, 'normalized', False):
+        return
+    original_size = photo.image.size
+    try:
+        upload.seek(0)
+        normalized = normalize_image(upload)
+    except Exception:
+        logger.exception('Could not normalize upload %s', photo.image.name)
+        raise ValidationError({'image': 'Η εικόνα δεν μπόρεσε να επεξεργαστεί. Δοκιμάστε άλλο αρχείο JPEG ή PNG.'})
+
+    name = os.path.basename(photo.image.name)
+    stem = os.path.splitext(name)[0]
+    normalized_file = ContentFile(normalized.data, name=f'{stem}.jpg')
+    normalized_file.normalized = True
+    normalized_file.upload = upload
+    photo.image = normalized_file
+    photo.original_size = original_size
+    photo.stored_size = len(normalized.data)
+    logger.info(
+        'Normalized photo upload %s: %d -> %d bytes (%dx%d), %d bytes saved',
+        name, original_size, photo.stored_size, normalized.width, normalized.height, photo.bytes_saved,
+    )
+
+
+def keep_original(photo):
+    """With PHOTO_KEEP_ORIGINALS, store the raw upload behind a normalized image"""
+    upload = getattr(photo.image.file, 'upload', None)
+    if not settings.PHOTO_KEEP_ORIGINALS or upload is None:
+        return
+    upload.seek(0)
+    ext = os.path.splitext(upload.name or '')[1].lower()
+    photo.original.save(f'{uuid.uuid4().hex}{ext}', upload, save=False)
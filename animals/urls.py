@@ -1,7 +1,7 @@
 from django.urls import path
 from django.views.generic import RedirectView
 from . import views
-from .qr_scanner import scan_qr_code, qr_scanner_page, public_qr_lookup
+from .qr_scanner import scan_qr_code, scan_qr_code_batch, qr_scanner_page, public_qr_lookup
 
 app_name = 'animals'
 
@@ -13,6 +13,7 @@ urlpatterns = [
     # QR Code functionality
     path('qr/scanner/', qr_scanner_page, name='qr_scanner'),
     path('api/v1/qr/scan/', scan_qr_code, name='qr_scan'),
+    path('api/v1/qr/scan/batch/', scan_qr_code_batch, name='qr_scan_batch'),
     path('api/v1/qr/lookup/', public_qr_lookup, name='qr_lookup'),
     
     # Authenticated animal management
@@ -0,0 +1,107 @@
+"""
+Vaccination due dates.
+
+LatestVaccination holds the most recent dose per animal and vaccine and is
+rebuilt for an animal whenever one of its vaccinations changes, so overdue
+and upcoming lists are a single range scan on its next_due_date index
+instead of a scan over the whole vaccination history.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Animal, LatestVaccination, Vaccination
+
+# Vaccination.update() refreshes the schedule when one of these changes
+SCHEDULE_FIELDS = {'animal', 'animal_id', 'vaccine_name', 'other_vaccine_name', 'date_administered', 'next_due_date'}
+
+# Animals that have left the shelter get no reminders
+REMINDER_EXCLUDED_STATUSES = ['adopted']
+
+DEFAULT_UPCOMING_DAYS = 14
+
+def vaccine_key(vaccination):
+    """Doses of 'other' vaccines are only comparable when the product name matches"""
+    other = vaccination.other_vaccine_name.strip() if vaccination.vaccine_name == 'other' else ''
+    return vaccination.vaccine_name, other
+
+
+def refresh_latest_vaccinations(animal_ids):
+    """Rebuild the LatestVaccination rows of the given animals (two reads plus the writes)"""
+    animal_ids = set(animal_ids)
+    if not animal_ids:
+        return
+    
+    with transaction.atomic():
+        # Lock the animal's rows before reading its doses
+        existing = {
+            (row.animal_id, row.vaccine_name, row.other_vaccine_name): row
+            for row in LatestVaccination.objects.select_for_update().filter(animal_id__in=animal_ids)
+        }
+        latest = {}
+        vaccinations = (Vaccination.objects.filter(animal_id__in=animal_ids)
+                        .only('id', 'animal_id', 'vaccine_name', 'other_vaccine_name', 'date_administered', 'next_due_date')
+                        .order_by('date_administered', 'id'))
+        for vaccination in vaccinations:
+            # Later doses overwrite earlier ones
+            latest[(vaccination.animal_id, *vaccine_key(vaccination))] = vaccination
+        
+        # Changed rows are replaced rather than updated: a dose can move to
+        # another key, and vaccination is one-to-one
+        to_delete = []
+        for key, row in existing.items():
+            vaccination = latest.get(key)
+            if vaccination is None or (row.vaccination_id, row.date_administered, row.next_due_date) != (
+                    vaccination.id, vaccination.date_administered, vaccination.next_due_date):
+                to_delete.append(row.pk)
+            else:
+                del latest[key]
+        if to_delete:
+            LatestVaccination.objects.filter(pk__in=to_delete).delete()
+        LatestVaccination.objects.bulk_create([
+            LatestVaccination(
+                animal_id=animal_id, vaccine_name=vaccine_name, other_vaccine_name=other,
+                vaccination_id=vaccination.id,
+                date_administered=vaccination.date_administered,
+                next_due_date=vaccination.next_due_date,
+            )
+            for (animal_id, vaccine_name, other), vaccination in latest.items()
+        ], ignore_conflicts=True)  # a concurrent refresh inserted the same new row
+
+
+def rebuild_schedule(batch_size=500):
+    """Recompute the whole LatestVaccination table; returns the number of animals"""
+    animal_ids = list(Animal.objects.values_list('pk', flat=True))
+    for start in range(0, len(animal_ids), batch_size):
+        refresh_latest_vaccinations(animal_ids[start:start + batch_size])
+    return len(animal_ids)
+
+
+def due_vaccinations(until, since=None, include_adopted=False):
+    """Latest doses whose next dose falls in [since, until], soonest first"""
+    queryset = LatestVaccination.objects.filter(next_due_date__lte=until)
+    if since is not None:
+        queryset = queryset.filter(next_due_date__gte=since)
+    if not include_adopted:
+        queryset = queryset.exclude(animal__adoption_status__in=REMINDER_EXCLUDED_STATUSES)
+    return queryset.select_related('animal').order_by('next_due_date', 'id')
+
+
+def overdue_vaccinations(today=None, **kwargs):
+    today = today or timezone.localdate()
+    return due_vaccinations(today - timedelta(days=1), **kwargs)
+
+
+def upcoming_vaccinations(days=DEFAULT_UPCOMING_DAYS, today=None, **kwargs):
+    today = today or timezone.localdate()
+    return due_vaccinations(today + timedelta(days=days), since=today, **kwargs)
+
+
+def vaccination_reminders(days=DEFAULT_UPCOMING_DAYS, today=None, **kwargs):
+    """{'overdue': [...], 'upcoming': [...]} of LatestVaccination rows"""
+    today = today or timezone.localdate()
+    return {
+        'overdue': list(overdue_vaccinations(today, **kwargs)),
+        'upcoming': list(upcoming_vaccinations(days, today, **kwargs)),
+    }
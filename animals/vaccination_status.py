@@ -0,0 +1,110 @@
+"""
+Per-animal vaccination status, computed for many animals at once.
+
+Summaries come from one grouped query over LatestVaccination (one row per
+animal and vaccine), so listing N animals costs one extra query, not N.
+With VACCINATION_STATUS_DENORMALIZED the status is also stored in
+Animal.vaccination_status (filterable in the admin), refreshed when
+vaccinations change and daily, since "overdue" depends on the date.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Case, Count, Exists, F, Max, Min, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from .models import Animal, LatestVaccination
+
+VaccinationSummary = namedtuple('VaccinationSummary', [
+    'status', 'rabies_current', 'rabies_last_dose', 'rabies_next_due', 'last_dose', 'next_due', 'overdue',
+])
+
+EMPTY_SUMMARY = VaccinationSummary('unvaccinated', False, None, None, None, None, 0)
+
+STATUS_LABELS = dict(Animal.VACCINATION_STATUS_CHOICES)
+
+
+def vaccination_summaries(animal_ids, today=None):
+    """{animal_id: VaccinationSummary} for the given animals, in one query"""
+    today = today or timezone.localdate()
+    rows = (LatestVaccination.objects.filter(animal_id__in=set(animal_ids))
+            .values('animal_id')
+            .annotate(
+                rabies_last_dose=Max('date_administered', filter=Q(vaccine_name='rabies')),
+                rabies_next_due=Max('next_due_date', filter=Q(vaccine_name='rabies')),
+                last_dose=Max('date_administered'),
+                next_due=Min('next_due_date'),
+                overdue=Count('pk', filter=Q(next_due_date__lt=today)),
+            )
+            .order_by())
+    summaries = {animal_id: EMPTY_SUMMARY for animal_id in animal_ids}
+    for row in rows:
+        rabies_current = row['rabies_last_dose'] is not None and (
+            row['rabies_next_due'] is None or row['rabies_next_due'] >= today
+        )
+        summaries[row['animal_id']] = VaccinationSummary(
+            status='overdue' if row['overdue'] else 'current',
+            rabies_current=rabies_current,
+            rabies_last_dose=row['rabies_last_dose'],
+            rabies_next_due=row['rabies_next_due'],
+            last_dose=row['last_dose'],
+            next_due=row['next_due'],
+            overdue=row['overdue'],
+        )
+    return summaries
+
+
+def attach_vaccination_summaries(animals, today=None):
+    """Set animal.vaccination_summary on each animal; returns them as a list"""
+    animals = list(animals)
+    summaries = vaccination_summaries([animal.pk for animal in animals], today)
+    for animal in animals:
+        animal.vaccination_summary = summaries[animal.pk]
+    return animals
+
+
+def get_vaccination_summary(animal):
+    """The attached summary, or one computed for this animal alone"""
+    summary = getattr(animal, 'vaccination_summary', None)
+    if summary is None:
+        summary = animal.vaccination_summary = vaccination_summaries([animal.pk])[animal.pk]
+    return summary
+
+
+def summary_payload(summary):
+    """JSON friendly summary (QR responses, API)"""
+    def iso(value):
+        return value.isoformat() if value else None
+    return {
+        'status': summary.status,
+        'status_display': STATUS_LABELS[summary.status],
+        'rabies_current': summary.rabies_current,
+        'rabies_last_dose': iso(summary.rabies_last_dose),
+        'rabies_next_due': iso(summary.rabies_next_due),
+        'last_dose': iso(summary.last_dose),
+        'next_due': iso(summary.next_due),
+        'overdue': summary.overdue,
+    }
+
+
+def status_expression(today):
+    """SQL CASE computing the same status as vaccination_summaries()"""
+    latest = LatestVaccination.objects.filter(animal=OuterRef('pk'))
+    return Case(
+        When(Exists(latest.filter(next_due_date__lt=today)), then=Value('overdue')),
+        When(Exists(latest), then=Value('current')),
+        default=Value('unvaccinated'),
+    )
+
+
+def refresh_vaccination_status(animal_ids=None, today=None):
+    """
+    Update the stored status of the given animals (all when None) in one
+    UPDATE, touching only rows whose status changed. Returns that count.
+    A no-op unless VACCINATION_STATUS_DENORMALIZED is set.
+    """
+    if not settings.VACCINATION_STATUS_DENORMALIZED:
+        return 0
+    queryset = Animal.objects.all() if animal_ids is None else Animal.objects.filter(pk__in=animal_ids)
+    status = status_expression(today or timezone.localdate())
+    return queryset.alias(new_status=status).exclude(vaccination_status=F('new_status')).update(vaccination_status=status)
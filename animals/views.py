@@ -4,8 +4,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.http import Http404
+from django.db.models import Q
+from datetime import datetime, timedelta, timezone as dt_timezone
 from .models import Animal, MedicalRecord, AnimalPhoto
 from .forms import AnimalForm, MedicalRecordForm, AnimalPhotoForm
+from .public_cache import CachedPublicPageMixin, get_catalog_version, get_animal_version
+from .search import search_animals, ranks_results
 
 class ShelterPermissionMixin(LoginRequiredMixin):
     """Mixin to check shelter permissions - simplified for single-tenant"""
@@ -23,15 +27,74 @@ class AdminOnlyMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_staff or self.request.user.is_superuser
 
-class AnimalListView(ShelterPermissionMixin, ListView):
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class KeysetLoadMoreMixin:
+    """
+    "Load more" mode for list views: ?mode=more (or an ?after= cursor) pages
+    on (created_at, id) instead of COUNT(*) + OFFSET, so every page costs the
+    same. The context gets has_more, next_cursor and next_query (the current
+    filters plus the cursor) for the next request.
+    """
+    keyset_page_size = 20
+
+    @property
+    def load_more(self):
+        return self.request.GET.get('mode') == 'more' or 'after' in self.request.GET
+
+    def get_paginate_by(self, queryset):
+        if self.load_more:
+            return None
+        return super().get_paginate_by(queryset)
+
+    def encode_cursor(self, obj):
+        delta = obj.created_at - EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        return f'{micros}-{obj.pk}'
+
+    def decode_cursor(self, cursor):
+        try:
+            micros, pk = cursor.split('-')
+            return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+        except ValueError:
+            raise Http404('Invalid cursor')
+
+    def keyset_page(self, queryset):
+        cursor = self.request.GET.get('after')
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        # One extra row tells whether there is another page
+        return queryset.order_by('-created_at', '-id')[:self.keyset_page_size + 1]
+
+    def get_context_data(self, **kwargs):
+        if not self.load_more:
+            return super().get_context_data(**kwargs)
+        objects = list(self.object_list)
+        has_more = len(objects) > self.keyset_page_size
+        objects = objects[:self.keyset_page_size]
+        context = super().get_context_data(object_list=objects, **kwargs)
+        context['load_more'] = True
+        context['has_more'] = has_more
+        context['next_cursor'] = self.encode_cursor(objects[-1]) if has_more else None
+        if has_more:
+            query = self.request.GET.copy()
+            query['mode'] = 'more'
+            query['after'] = context['next_cursor']
+            context['next_query'] = query.urlencode()
+        return context
+
+
+class AnimalListView(ShelterPermissionMixin, KeysetLoadMoreMixin, ListView):
     model = Animal
     template_name = 'animals/animal_list.html'
     context_object_name = 'animals'
     paginate_by = 20
+    query_budget = 10
 
     def get_queryset(self):
-        from django.db import models
-        queryset = Animal.objects.all().prefetch_related('photos', 'medical_records')
+        queryset = Animal.objects.with_primary_photo().prefetch_related('medical_records')
 
         # Apply filters
         species = self.request.GET.get('species')
@@ -42,19 +105,22 @@ class AnimalListView(ShelterPermissionMixin, ListView):
         if adoption_status:
             queryset = queryset.filter(adoption_status=adoption_status)
 
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(chip_id__icontains=search)
-            )
+        if self.load_more:
+            return self.keyset_page(search_animals(queryset, self.request.GET.get('search', '')))
 
+        search = self.request.GET.get('search', '').strip()
+        if search:
+            # Ranked by relevance where the database supports it
+            queryset = search_animals(queryset, search)
+            if ranks_results(queryset):
+                return queryset
         return queryset.order_by('-created_at')
 
 class AnimalDetailView(ShelterPermissionMixin, DetailView):
     model = Animal
     template_name = 'animals/animal_detail.html'
     context_object_name = 'animal'
+    query_budget = 10
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -121,6 +187,7 @@ class AnimalPhotoListView(ShelterPermissionMixin, ListView):
     model = AnimalPhoto
     template_name = 'animals/animal_photos.html'
     context_object_name = 'photos'
+    query_budget = 6
 
     def dispatch(self, request, *args, **kwargs):
         self.animal = get_object_or_404(Animal, pk=kwargs['animal_id'])
@@ -136,25 +203,36 @@ class AnimalPhotoListView(ShelterPermissionMixin, ListView):
         return context
 
 # Public views (no authentication required)
-class PublicAdoptionView(ListView):
+class PublicAdoptionView(CachedPublicPageMixin, ListView):
     model = Animal
     template_name = 'public/adoption_list.html'
     context_object_name = 'animals'
     paginate_by = 12
+    query_budget = 6
+    cache_query_params = ('page',)
+
+    def get_page_version(self):
+        version = get_catalog_version()
+        return version, version
 
     def get_queryset(self):
-        return Animal.objects.filter(
-            public_visibility=True,
-            adoption_status__in=['available', 'pending']
-        ).prefetch_related('photos').order_by('-created_at')
+        return Animal.objects.publicly_listed().with_primary_photo().order_by('-created_at')
 
-class PublicAnimalDetailView(DetailView):
+class PublicAnimalDetailView(CachedPublicPageMixin, DetailView):
     model = Animal
     template_name = 'public/animal_detail.html'
     context_object_name = 'animal'
+    query_budget = 8
+
+    def get_page_version(self):
+        pk = self.kwargs['pk']
+        version = get_animal_version(pk)
+        if version is None:
+            return None
+        return f'{pk}-{version}', version
 
     def get_queryset(self):
-        return Animal.objects.filter(public_visibility=True)
+        return Animal.objects.filter(public_visibility=True).with_primary_photo().prefetch_related('photos')
 
 # Landing page (no authentication required)
 class LandingPageView(TemplateView):
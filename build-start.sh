@@ -15,4 +15,6 @@ docker-compose exec web python manage.py create_shelter \
     --admin-email "admin@myshelter.com"
 
 # 4. Generate QR codes
-docker-compose exec web python manage.py generate_qr_codes
\ No newline at end of file
+docker-compose exec web python manage.py generate_qr_codes
+# 5. Generate photo renditions (photos uploaded before they existed)
+docker-compose exec web python manage.py generate_photo_renditions
@@ -0,0 +1,9 @@
+#!/bin/sh
+# prometheus_client's multiprocess mode needs an empty directory per run:
+# files left by a previous run would keep counting (stale livesum gauges)
+set -e
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    find "$PROMETHEUS_MULTIPROC_DIR" -mindepth 1 -delete
+fi
+exec "$@"
@@ -0,0 +1,9 @@
+# Loaded automatically by gunicorn from the working directory (/app)
+import os
+
+
+def child_exit(server, worker):
+    # Stop counting an exited worker in the "livesum" gauges (animals/metrics.py)
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,18 @@
+"""
+ASGI config for shelter_registry project.
+
+Served by gunicorn with uvicorn workers (see Dockerfile); the QR lookup/scan
+and public adoption views are async, everything else runs in Django's
+thread executor. Async views still hop to threads for the sync middleware
+(sessions, CSRF, auth, messages), the cache and the ORM, which are all sync
+in Django 4.2; they batch their own sync work into as few hops as possible.
+The WSGI entry point still works for sync-only hosting.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shelter_registry.settings')
+
+application = get_asgi_application()
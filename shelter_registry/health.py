@@ -1,24 +1,162 @@
-from django.http import JsonResponse
+"""
+Liveness and readiness endpoints.
+
+/health/live only proves the process answers requests (Docker HEALTHCHECK).
+/health/ready runs the PROBES - database, media volume, migrations, worker
+queues - and answers 503 when a critical one fails. Probe results are
+cached per process for HEALTH_CHECK_CACHE_TTL seconds, so frequent nginx or
+orchestrator polling does not turn into database load, and every probe
+reports its latency. It is public through nginx, so the per-probe details
+(versions, pool stats, disk space, error messages) are only shown to staff
+users and to the monitoring clients allowed to scrape /metrics.
+"""
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
 from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Min
+from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
 
-@csrf_exempt
-@require_http_methods(["GET"])
-def health_check(request):
-    """Health check endpoint for container monitoring"""
+from animals.metrics import HEALTH_PROBE_LATENCY, metrics_allowed
+from animals.query_budget import query_budget
+from animals.version import get_version
+
+Probe = namedtuple('Probe', ['name', 'check', 'critical'])
+
+# name -> Probe, filled by @register_probe in run order
+PROBES = {}
+
+
+class ProbeWarning(Exception):
+    """The dependency works but needs attention; does not make the instance unready"""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+def register_probe(name, critical=True):
+    """Register check() -> dict of details; raise to fail it (ProbeWarning to only warn)"""
+    def decorator(check):
+        PROBES[name] = Probe(name, check, critical)
+        return check
+    return decorator
+
+
+@register_probe('database')
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    details = {'vendor': connection.vendor}
+    pool = getattr(connection, 'pool', None)
+    if pool is not None:
+        details['pool'] = pool.stats()
+    return details
+
+
+@register_probe('media')
+def check_media():
+    with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT, prefix='.health-'):
+        pass
+    free_mb = shutil.disk_usage(settings.MEDIA_ROOT).free // (1024 * 1024)
+    if free_mb < settings.HEALTH_MEDIA_MIN_FREE_MB:
+        raise ProbeWarning(f'{free_mb} MB free on the media volume', free_mb=free_mb)
+    return {'writable': True, 'free_mb': free_mb}
+
+
+@register_probe('migrations')
+def check_migrations():
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migrations, e.g. {plan[0][0]}')
+    return {'unapplied': 0}
+
+
+@register_probe('queues', critical=False)
+def check_queues():
+    from animals.models import ExportJob, QRCodeJob
+
+    now = timezone.now()
+    qr = QRCodeJob.objects.filter(run_after__lte=now).aggregate(oldest=Min('run_after'))
+    exports = ExportJob.objects.filter(status='queued').aggregate(oldest=Min('created_at'))
+    details = {}
+    stalled = []
+    for name, oldest in (('qr_codes', qr['oldest']), ('exports', exports['oldest'])):
+        age = int((now - oldest).total_seconds()) if oldest else 0
+        details[f'{name}_oldest_seconds'] = age
+        if age > settings.HEALTH_QUEUE_MAX_AGE:
+            stalled.append(name)
+    if stalled:
+        raise ProbeWarning(f'Worker backlog older than {settings.HEALTH_QUEUE_MAX_AGE}s: {", ".join(stalled)}', **details)
+    return details
+
+
+def run_probe(probe):
+    start = time.perf_counter()
     try:
-        # Check database connection
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        
-        return JsonResponse({
-            'status': 'healthy',
-            'database': 'connected',
-            'version': '1.0.0'
-        })
+        result = {'status': 'ok', **probe.check()}
+    except ProbeWarning as warning:
+        result = {'status': 'warn', 'message': str(warning), **warning.details}
     except Exception as e:
-        return JsonResponse({
-            'status': 'unhealthy',
-            'error': str(e)
-        }, status=503)
\ No newline at end of file
+        result = {'status': 'fail' if probe.critical else 'warn', 'message': str(e)}
+    duration = time.perf_counter() - start
+    HEALTH_PROBE_LATENCY.labels(probe.name).observe(duration)
+    result['latency_ms'] = round(duration * 1000, 1)
+    return result
+
+
+class ProbeCache:
+    """Per-process probe results, refreshed at most every HEALTH_CHECK_CACHE_TTL seconds"""
+
+    def __init__(self):
+        self._results = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """(results, age in seconds)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._results is None or now - self._checked_at >= settings.HEALTH_CHECK_CACHE_TTL:
+                self._results = {name: run_probe(probe) for name, probe in PROBES.items()}
+                self._checked_at = now
+            return self._results, now - self._checked_at
+
+
+probe_cache = ProbeCache()
+
+
+@require_http_methods(["GET", "HEAD"])
+def health_live(request):
+    """Liveness: no dependencies are touched"""
+    return JsonResponse({'status': 'alive', 'version': get_version()})
+
+
+@query_budget(10)
+@require_http_methods(["GET", "HEAD"])
+def health_ready(request):
+    """Readiness: cached dependency probes, 503 when a critical one fails"""
+    checks, age = probe_cache.get()
+    statuses = {check['status'] for check in checks.values()}
+    status = 'unhealthy' if 'fail' in statuses else 'degraded' if 'warn' in statuses else 'healthy'
+    http_status = 503 if status == 'unhealthy' else 200
+    if not (metrics_allowed(request) or request.user.is_staff):
+        return JsonResponse({'status': status}, status=http_status)
+    return JsonResponse({
+        'status': status,
+        'version': get_version(),
+        'checked_seconds_ago': round(age, 1),
+        'checks': checks,
+    }, status=http_status)
+
+
+# /health/ predates the split and keeps answering with the readiness report
+health_check = health_ready
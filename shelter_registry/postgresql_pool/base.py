@@ -0,0 +1,62 @@
+"""
+PostgreSQL backend whose connections come from a per-process pool.
+
+Django still opens and closes a connection around each request
+(CONN_MAX_AGE = 0), but "closing" hands the psycopg2 connection back to the
+pool and the next request reuses it, skipping the TCP and authentication
+handshake. Settings live under DATABASES[alias]['POOL']:
+MAX_SIZE, IDLE_TIMEOUT, WAIT_TIMEOUT and CHECK_AFTER (see ConnectionPool).
+Session-level SET commands outlive a request; use SET LOCAL in a transaction.
+
+Connections Django opens without a database (creating and dropping test
+databases) are not pooled, and the test database's pools are closed before
+it is cloned or dropped, which PostgreSQL refuses while anyone is connected.
+"""
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from psycopg2.extensions import ISOLATION_LEVEL_READ_COMMITTED
+
+from .creation import DatabaseCreation
+from .pool import get_pool
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,
+    'IDLE_TIMEOUT': 300,
+    'WAIT_TIMEOUT': 10,
+    'CHECK_AFTER': 30,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        # Test database setup connects to another database with the same alias
+        key = (self.alias, repr(sorted(conn_params.items())))
+        return get_pool(
+            key,
+            max_size=options['MAX_SIZE'],
+            idle_timeout=options['IDLE_TIMEOUT'],
+            wait_timeout=options['WAIT_TIMEOUT'],
+            check_after=options['CHECK_AFTER'],
+        )
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # Set by the parent only for connections it opens
+        self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', ISOLATION_LEVEL_READ_COMMITTED)
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+        # Broken connections, and ones Django keeps referencing (closed inside
+        # an atomic block), are really closed instead of being shared
+        reusable = not self.in_atomic_block and (not self.errors_occurred or self.is_usable())
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, reusable)
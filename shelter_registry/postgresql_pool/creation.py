@@ -0,0 +1,22 @@
+from django.db.backends.postgresql import creation
+
+from .pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close the pooled connections to a database before it is replaced, copied or dropped"""
+
+    def create_test_db(self, *args, **kwargs):
+        # The tests never use the connections to the real database
+        self.connection.close()
+        close_pools(self.connection.alias)
+        return super().create_test_db(*args, **kwargs)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close()
+        close_pools(self.connection.alias)
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
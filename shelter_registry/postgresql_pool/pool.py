@@ -0,0 +1,196 @@
+"""
+Thread-safe pool of raw psycopg2 connections, shared by all threads of a
+process (gunicorn threads, the ASGI sync_to_async executor).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from animals.metrics import DB_POOL_CONNECTIONS, DB_POOL_EVENTS
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within the wait timeout"""
+
+
+class ConnectionPool:
+    """
+    At most max_size connections. Idle ones are reused most recent first,
+    closed after idle_timeout seconds, and pinged with SELECT 1 before reuse
+    when they have been idle longer than check_after seconds.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=300, wait_timeout=10, check_after=30):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.check_after = check_after
+        self.pid = os.getpid()
+        self.closed = False
+        self._idle = deque()  # (connection, released_at), newest last
+        self._size = 0
+        self._condition = threading.Condition()
+        self._counters = {'created': 0, 'reused': 0, 'discarded': 0, 'expired': 0, 'waits': 0, 'timeouts': 0}
+
+    def _count(self, name, amount=1):
+        # Called with the lock held
+        self._counters[name] += amount
+        DB_POOL_EVENTS.labels(name).inc(amount)
+
+    def _update_gauges(self):
+        DB_POOL_CONNECTIONS.labels('idle').set(len(self._idle))
+        DB_POOL_CONNECTIONS.labels('in_use').set(self._size - len(self._idle))
+
+    def acquire(self, connect):
+        """An idle connection, or a new one from connect() while below max_size"""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stale = []
+            with self._condition:
+                self._expire_idle(stale)
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    self._update_gauges()
+                elif self._size < self.max_size:
+                    connection, released_at = None, None
+                    self._size += 1
+                    self._update_gauges()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._count('timeouts')
+                        raise PoolTimeout(f'No database connection free within {self.wait_timeout}s (pool size {self.max_size})')
+                    self._count('waits')
+                    self._condition.wait(remaining)
+                    continue
+            self._close_all(stale)
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self._forget()
+                    raise
+                with self._condition:
+                    self._count('created')
+                return connection
+
+            if self._usable(connection, released_at):
+                with self._condition:
+                    self._count('reused')
+                return connection
+            self._close_all([connection])
+            self._forget('discarded')
+
+    def release(self, connection, reusable=True):
+        """Return a connection; it is closed instead if it is broken or reusable is False"""
+        if reusable and not connection.closed:
+            status = connection.get_transaction_status()
+            if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    reusable = False
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                reusable = False
+        if not reusable or connection.closed or self.closed:
+            self._close_all([connection])
+            self._forget('discarded')
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._update_gauges()
+            self._condition.notify()
+
+    def _usable(self, connection, released_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _expire_idle(self, stale):
+        # Called with the lock held; the oldest connections are at the left
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._count('expired')
+        if stale:
+            self._update_gauges()
+            self._condition.notify(len(stale))
+
+    def _forget(self, counter=None):
+        """A checked-out connection went away: free its slot"""
+        with self._condition:
+            self._size -= 1
+            if counter:
+                self._count(counter)
+            self._update_gauges()
+            self._condition.notify()
+
+    def _close_all(self, connections):
+        for connection in connections:
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+
+    def close(self):
+        """Close the idle connections; checked-out ones are closed on release"""
+        with self._condition:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._update_gauges()
+        self._close_all(idle)
+
+    def stats(self):
+        with self._condition:
+            return dict(
+                self._counters,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                max_size=self.max_size,
+            )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """The process's pool for an (alias, connection parameters) key (a new one after fork)"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def close_pools(alias):
+    """Close and forget this process's pools for a database alias"""
+    with _pools_lock:
+        keys = [key for key in _pools if key[0] == alias]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+def pool_stats():
+    """{pool key: stats} for the pools of this process"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.stats() for key, pool in pools.items() if pool.pid == os.getpid()}
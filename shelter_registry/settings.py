@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'animals.metrics.MetricsMiddleware',
+    'animals.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,16 +71,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'shelter_registry.wsgi.application'
+ASGI_APPLICATION = 'shelter_registry.asgi.application'
 
 # Database
+# DB_POOL=1 (default) reuses connections from a per-process pool (see
+# shelter_registry/postgresql_pool); the pool size bounds every worker's
+# connections whatever its thread count
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'shelter_registry.postgresql_pool' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME', 'shelter_registry'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'db'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'IDLE_TIMEOUT': int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300)),
+            'WAIT_TIMEOUT': int(os.environ.get('DB_POOL_WAIT_TIMEOUT', 10)),
+            'CHECK_AFTER': int(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+        },
     }
 }
 
@@ -110,9 +124,83 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Files that must never be served (the raw photo uploads, see animals/uploads.py)
+PRIVATE_MEDIA_ROOT = os.environ.get('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache (file based so that all gunicorn workers share invalidations). The
+# QR and export workers bump the public page and chip lookup versions too,
+# so CACHE_DIR must be one directory shared with them (see docker-compose.yml)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', '/tmp/shelter_cache'),
+    }
+}
+
+# Seconds to keep the admin statistics snapshot (0 disables caching)
+ANIMAL_STATS_CACHE_TIMEOUT = int(os.environ.get('ANIMAL_STATS_CACHE_TIMEOUT', 300))
+
+# Public adoption pages: server-side page cache lifetime and browser/nginx max-age
+PUBLIC_PAGE_CACHE_TIMEOUT = int(os.environ.get('PUBLIC_PAGE_CACHE_TIMEOUT', 3600))
+PUBLIC_PAGE_MAX_AGE = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 60))
+
+# chip_id lookup cache for the QR scan endpoints: per-process LRU plus an
+# optional shared cache alias ('' disables the shared layer)
+QR_LOOKUP_CACHE_TTL = int(os.environ.get('QR_LOOKUP_CACHE_TTL', 30))
+QR_LOOKUP_CACHE_MAX_ENTRIES = int(os.environ.get('QR_LOOKUP_CACHE_MAX_ENTRIES', 2048))
+QR_LOOKUP_SHARED_CACHE = os.environ.get('QR_LOOKUP_SHARED_CACHE', 'default')
+QR_LOOKUP_SHARED_CACHE_TTL = int(os.environ.get('QR_LOOKUP_SHARED_CACHE_TTL', 600))
+
+# QR code render queue (see process_qr_queue command)
+QR_CODE_MAX_ATTEMPTS = int(os.environ.get('QR_CODE_MAX_ATTEMPTS', 5))
+
+# Background exports (see process_export_jobs command): a running job whose
+# worker has not reported progress for this many seconds is requeued
+EXPORT_JOB_STALE_AFTER = int(os.environ.get('EXPORT_JOB_STALE_AFTER', 600))
+
+# Store each animal's vaccination status in Animal.vaccination_status (refreshed on
+# vaccination changes and by the daily vaccination_reminders command)
+VACCINATION_STATUS_DENORMALIZED = os.environ.get('VACCINATION_STATUS_DENORMALIZED', '1') == '1'
+
+# Uploaded animal photos are re-encoded as metadata-free JPEGs of at most this
+# many pixels per side; set PHOTO_KEEP_ORIGINALS=1 to also store the raw upload
+# (under PRIVATE_MEDIA_ROOT)
+PHOTO_UPLOAD_MAX_DIMENSION = int(os.environ.get('PHOTO_UPLOAD_MAX_DIMENSION', 2560))
+PHOTO_UPLOAD_QUALITY = int(os.environ.get('PHOTO_UPLOAD_QUALITY', 85))
+PHOTO_KEEP_ORIGINALS = os.environ.get('PHOTO_KEEP_ORIGINALS', '0') == '1'
+
+# Per-request SQL instrumentation (see animals/query_budget.py): requests over
+# their query budget, or repeating one query shape more than the duplicate
+# limit (N+1), are logged, or raise with SQL_QUERY_BUDGET_STRICT=1 (tests)
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
+SQL_QUERY_BUDGET_STRICT = os.environ.get('SQL_QUERY_BUDGET_STRICT', '0') == '1'
+SQL_QUERY_BUDGET_DEFAULT = int(os.environ.get('SQL_QUERY_BUDGET_DEFAULT', 30))
+SQL_DUPLICATE_QUERY_LIMIT = int(os.environ.get('SQL_DUPLICATE_QUERY_LIMIT', 3))
+# URL name -> query budget, for views without a query_budget attribute
+SQL_QUERY_BUDGETS = {
+    'admin:animals_animal_changelist': 15,
+    'admin:animals_vaccination_changelist': 10,
+    'admin:animals_medicalrecord_changelist': 10,
+    'admin:animals_animalphoto_changelist': 10,
+    'admin:animals_latestvaccination_changelist': 10,
+    'admin:animals_exportjob_changelist': 10,
+}
+
+# /metrics answers clients from these addresses/networks, or ones sending
+# "Authorization: Bearer $METRICS_TOKEN". The QR and export workers serve their
+# own metrics on WORKER_METRICS_PORT (0 disables), inside the container network.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+WORKER_METRICS_PORT = int(os.environ.get('WORKER_METRICS_PORT', 0))
+
+# /health/ready: seconds the dependency probes are cached per process, free
+# space (MB) on the media volume and worker queue age (s) before warning
+HEALTH_CHECK_CACHE_TTL = int(os.environ.get('HEALTH_CHECK_CACHE_TTL', 10))
+HEALTH_MEDIA_MIN_FREE_MB = int(os.environ.get('HEALTH_MEDIA_MIN_FREE_MB', 500))
+HEALTH_QUEUE_MAX_AGE = int(os.environ.get('HEALTH_QUEUE_MAX_AGE', 900))
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -122,7 +210,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'animals.api.pagination.CreatedAtCursorPagination',
     'PAGE_SIZE': 20
 }
 
@@ -4,16 +4,23 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from rest_framework.routers import DefaultRouter
-from animals.api.views import AnimalViewSet, MedicalRecordViewSet, AnimalPhotoViewSet
+from animals.api.views import AnimalViewSet, MedicalRecordViewSet, AnimalPhotoViewSet, VaccinationViewSet
+from animals.metrics import metrics_view
+from shelter_registry.health import health_check, health_live, health_ready
 
 # API Router
 router = DefaultRouter()
 router.register(r'animals', AnimalViewSet, basename='animal')
 router.register(r'medical-records', MedicalRecordViewSet, basename='medicalrecord')
 router.register(r'photos', AnimalPhotoViewSet, basename='animalphoto')
+router.register(r'vaccinations', VaccinationViewSet, basename='vaccination')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('health/', health_check, name='health'),
+    path('health/live', health_live, name='health_live'),
+    path('health/ready', health_ready, name='health_ready'),
     path('api/v1/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),
     path('', include('animals.urls')),  # Animals URLs at root (includes /adopt/, /qr/, etc)